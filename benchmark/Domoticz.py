@@ -0,0 +1,36 @@
+"""Stand-in for the Domoticz module injected into plugins by Domoticz.
+
+Everything except the connections is the gateway's gatewayDomoticz module:
+log counters, Device, Devices, Parameters, install() and reset() are looked
+up there. Connections do not open sockets, they keep what is sent in sent.
+The plugin log is only printed when logging is configured (--verbose).
+"""
+import logging
+import gatewayDomoticz
+
+gatewayDomoticz.logger.addHandler(logging.NullHandler())
+
+def __getattr__(name):
+    # module state lives in gatewayDomoticz, so counters are read live
+    return getattr(gatewayDomoticz, name)
+
+class Connection(gatewayDomoticz.Connection):
+    def __init__(self, Name, Transport, Protocol="None", Address="", Port="", Baud=0):
+        super().__init__(Name, Transport, Protocol, Address, Port, Baud)
+        self.listening = False
+        self.sent = []
+
+    def Listen(self):
+        self.listening = True
+
+    def Connect(self):
+        pass
+
+    def Disconnect(self):
+        self.listening = False
+
+    def Connected(self):
+        return self.listening
+
+    def Send(self, Message, Delay=0):
+        self.sent.append(Message)
@@ -0,0 +1,428 @@
+"""Replay benchmark for plugin.py using the stand-in Domoticz module.
+
+Feeds recorded or synthetic MySensors, SSDP and DDD datagrams through the
+plugin onMessage callback and reports packets per second, per-stage latency
+percentiles and (optionally) memory allocations.
+
+Examples:
+    python3 benchmark/benchPlugin.py --nodes 200 --packets 50000
+    python3 benchmark/benchPlugin.py --mix mysensors=8,ssdp=1,ddd=1 --rate 2000
+    python3 benchmark/benchPlugin.py --replay capture.txt --tracemalloc
+
+Replay files hold one datagram per line, optionally prefixed by the protocol
+name and a tab; escape sequences such as \\r\\n are decoded.
+"""
+import argparse
+import codecs
+import importlib
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import Domoticz
+
+PROTOCOLS = ("mysensors", "ssdp", "ddd")
+
+# Hardware page settings used for the benchmark
+DEFAULT_PARAMETERS = {
+    "Name": "UDP Discovery",
+    "HomeFolder": "",   # temporary folder created per run when empty
+    "HardwareID": "1",
+    "Mode1": "255.255.255.255:9009",
+    "Mode2": "True",
+    "Mode3": "10",
+    # replay runs faster than real sources, per-source limit is off by default
+    "Mode4": "sendRate=20;sendBurst=10;rateLimit=0",
+    "Mode6": "Normal",
+}
+
+#############################################################################
+#                           Traffic generation                              #
+#############################################################################
+# sensors presented by each synthetic node: (sensorID, S_* type, V_* types)
+NODE_SENSORS = (
+    (0, 6, (0,)),           # S_TEMP: V_TEMP
+    (1, 7, (1,)),           # S_HUM: V_HUM
+    (2, 8, (4, 5)),         # S_BARO: V_PRESSURE, V_FORECAST
+    (3, 13, (17, 18)),      # S_POWER: V_WATT, V_KWH
+)
+FORECASTS = ("stable", "sunny", "cloudy", "unstable")
+
+def nodeMac(node):
+    return "00:0a:95:%02x:%02x:%02x" % ((node >> 16) & 0xff, (node >> 8) & 0xff, node & 0xff)
+
+def setPayload(valueType, rng):
+    if valueType == 5:
+        return rng.choice(FORECASTS)
+    if valueType == 1:
+        return str(rng.randint(20, 90))
+    return "%.1f" % rng.uniform(0, 1100)
+
+def mySensorsBoot(nodes):
+    # every node asks for an ID and presents itself and its sensors
+    for node in range(1, nodes + 1):
+        mac = nodeMac(node)
+        yield node, ("255;255;3;0;3;" + mac).encode()
+        yield node, ("%d;255;0;0;17;2.0.0" % node).encode()
+        for sensorID, sensorType, valueTypes in NODE_SENSORS:
+            yield node, ("%d;%d;0;0;%d;%s" % (node, sensorID, sensorType, mac)).encode()
+
+def mySensorsValue(nodes, rng):
+    node = rng.randint(1, nodes)
+    sensorID, sensorType, valueTypes = rng.choice(NODE_SENSORS)
+    valueType = rng.choice(valueTypes)
+    return node, ("%d;%d;1;0;%d;%s" % (node, sensorID, valueType, setPayload(valueType, rng))).encode()
+
+def ssdpNotify(nodes, rng):
+    host = rng.randint(1, nodes)
+    return host, ("NOTIFY * HTTP/1.1\r\n"
+                  "HOST: 239.255.255.250:1900\r\n"
+                  "CACHE-CONTROL: max-age=1800\r\n"
+                  "LOCATION: http://10.0.%d.%d:80/description.xml\r\n"
+                  "NT: upnp:rootdevice\r\n"
+                  "NTS: ssdp:alive\r\n"
+                  "SERVER: Linux/4.4 UPnP/1.0 bench/1.0\r\n"
+                  "USN: uuid:bench-%08x::upnp:rootdevice\r\n\r\n"
+                  % (host >> 8, host & 0xff, host)).encode()
+
+def dddBeacon(nodes, rng):
+    host = rng.randint(1, nodes)
+    return host, ("AMXB<-UUID=GlobalCache_%012X><-SDKClass=Utility>"
+                  "<-Make=GlobalCache><-Model=iTachIP2IR><-Revision=710-1001-05>"
+                  "<-Config-URL=http://10.0.%d.%d.><-Status=Ready>\r"
+                  % (host, host >> 8, host & 0xff)).encode()
+
+def syntheticTraffic(nodes, packets, mix, seed):
+    # yields (protocol, source, datagram)
+    rng = random.Random(seed)
+    count = 0
+    if mix.get("mysensors"):
+        for source, data in mySensorsBoot(nodes):
+            yield "mysensors", source, data
+            count += 1
+    generators = {"mysensors": mySensorsValue, "ssdp": ssdpNotify, "ddd": dddBeacon}
+    protocols = [protocol for protocol in PROTOCOLS if mix.get(protocol)]
+    weights = [mix[protocol] for protocol in protocols]
+    while count < packets:
+        protocol = rng.choices(protocols, weights)[0]
+        source, data = generators[protocol](nodes, rng)
+        yield protocol, source, data
+        count += 1
+
+def replayTraffic(fileName):
+    with open(fileName, "rb") as replayFile:
+        for line in replayFile:
+            line = line.rstrip(b"\r\n")
+            if not line or line.startswith(b"#"):
+                continue
+            protocol, sep, data = line.partition(b"\t")
+            if not sep:
+                protocol, data = b"mysensors", line
+            yield protocol.decode(), 0, codecs.escape_decode(data)[0]
+
+#############################################################################
+#                             Measurement                                   #
+#############################################################################
+class StageTimer:
+    """Collects durations (ns) of one processing stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+
+    def wrap(self, function):
+        samples = self.samples
+        clock = time.perf_counter_ns
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(clock() - start)
+        return timed
+
+    def percentiles(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        def at(fraction):
+            return samples[min(len(samples) - 1, int(len(samples) * fraction))] / 1000.0
+        return {"count": len(samples), "p50": at(0.50), "p90": at(0.90),
+                "p99": at(0.99), "max": samples[-1] / 1000.0}
+
+def loadPlugin(parameters):
+    Domoticz.reset()
+    Domoticz.Parameters.update(parameters)
+    plugin = sys.modules.get("plugin")
+    plugin = importlib.reload(plugin) if plugin else importlib.import_module("plugin")
+    Domoticz.install(plugin)
+    return plugin
+
+# listener names used by plugin.py for each protocol
+LISTENER_NAMES = {"mysensors": "MySensors", "ssdp": "SSDP", "ddd": "DDD"}
+
+def connectionFor(plugin, protocol, source, connections):
+    # one connection object per sender, like Domoticz does for UDP
+    key = (protocol, source)
+    connection = connections.get(key)
+    if connection is None:
+        listeners = plugin._plugin.listeners
+        # datagram of a protocol without listener arrives on the configured one
+        listener = listeners.get(LISTENER_NAMES[protocol]) or next(iter(listeners.values()))
+        connection = Domoticz.Connection(Name=listener.Name, Transport="UDP/IP",
+                Address="10.0.%d.%d" % (source >> 8, source & 0xff), Port=listener.Port)
+        connections[key] = connection
+    return connection
+
+def instrument(plugin, stages):
+    # wrap stage entry points, returns function restoring the originals
+    decoders = plugin._plugin.decoders
+    originals = dict(decoders)
+    for name, decoder in originals.items():
+        decoders[name] = stages["parse"].wrap(decoder)
+    dispatcher = plugin._plugin.dispatcher
+    dispatcher.dispatch = stages["dispatch"].wrap(dispatcher.dispatch)
+    plugin.updateCache.flush = stages["flush"].wrap(plugin.updateCache.flush)
+    def restore():
+        decoders.update(originals)
+    return restore
+
+def runBenchmark(traffic, parameters, rate=0, heartbeat=None, traceMalloc=False):
+    if not parameters.get("HomeFolder"):
+        parameters = dict(parameters, HomeFolder=tempfile.mkdtemp(prefix="udpdiscovery-bench-") + os.sep)
+    plugin = loadPlugin(parameters)
+    plugin.onStart()
+    stages = {name: StageTimer(name) for name in ("total", "parse", "dispatch", "flush")}
+    restore = instrument(plugin, stages)
+    onMessage = stages["total"].wrap(plugin.onMessage)
+    heartbeatInterval = heartbeat if heartbeat is not None else Domoticz.heartbeat
+    connections = {}
+    packets = 0
+    if traceMalloc:
+        tracemalloc.start()
+        memoryBefore = tracemalloc.get_traced_memory()[0]
+    try:
+        start = time.perf_counter()
+        nextHeartbeat = start + heartbeatInterval
+        for protocol, source, data in traffic:
+            if rate:
+                delay = start + packets / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            onMessage(connectionFor(plugin, protocol, source, connections), data)
+            packets += 1
+            now = time.perf_counter()
+            if now >= nextHeartbeat:
+                plugin.onHeartbeat()
+                nextHeartbeat = now + heartbeatInterval
+        # in pipeline mode onStop handles everything still being decoded
+        plugin.onStop()
+        elapsed = time.perf_counter() - start
+        if traceMalloc:
+            memoryAfter, memoryPeak = tracemalloc.get_traced_memory()
+    finally:
+        if traceMalloc:
+            tracemalloc.stop()
+        restore()
+    result = {
+        "packets": packets,
+        "seconds": elapsed,
+        "packetsPerSecond": packets / elapsed if elapsed else 0.0,
+        "stages": {name: timer.percentiles() for name, timer in stages.items()},
+        "devices": len(Domoticz.Devices),
+        "deviceWrites": sum(device.updateCount for device in Domoticz.Devices.values()),
+        "sent": sum(len(connection.sent) for connection in connections.values()) +
+                sum(len(listener.sent) for listener in plugin._plugin.listeners.values()),
+        "logLines": Domoticz.logCount,
+        "errors": Domoticz.errorCount,
+    }
+    if traceMalloc:
+        result["memory"] = {"peakKiB": memoryPeak / 1024.0,
+                            "retainedBytesPerPacket": (memoryAfter - memoryBefore) / max(packets, 1)}
+    return result
+
+def printResult(result):
+    print("packets: %d in %.3f s -> %.0f packets/s" % (result["packets"], result["seconds"], result["packetsPerSecond"]))
+    print("%-10s %8s %10s %10s %10s %10s" % ("stage (us)", "count", "p50", "p90", "p99", "max"))
+    for name, stats in result["stages"].items():
+        if stats:
+            print("%-10s %8d %10.1f %10.1f %10.1f %10.1f" % (name, stats["count"], stats["p50"], stats["p90"], stats["p99"], stats["max"]))
+    print("devices: %d, device writes: %d, sent: %d, log lines: %d, errors: %d" % (
+        result["devices"], result["deviceWrites"], result["sent"], result["logLines"], result["errors"]))
+    if "memory" in result:
+        print("memory: peak %.1f KiB, retained %.1f bytes/packet" % (
+            result["memory"]["peakKiB"], result["memory"]["retainedBytesPerPacket"]))
+
+#############################################################################
+#                          Load test of gateway.py                          #
+#############################################################################
+def sendTraffic(traffic, target, rate=0):
+    # send traffic to a running gateway.py as UDP datagrams
+    address, sep, port = target.rpartition(":")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    packets = 0
+    start = time.perf_counter()
+    for protocol, source, data in traffic:
+        if rate:
+            delay = start + packets / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sock.sendto(data, (address, int(port)))
+        packets += 1
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return {"packets": packets, "seconds": elapsed, "packetsPerSecond": packets / elapsed if elapsed else 0.0}
+
+#############################################################################
+#                              Startup cost                                 #
+#############################################################################
+def purgePluginModules():
+    # plugin.py and the modules next to it are imported again on next use
+    root = os.path.dirname(BENCH_DIR)
+    for name, module in list(sys.modules.items()):
+        if os.path.dirname(getattr(module, "__file__", None) or "") == root:
+            del sys.modules[name]
+
+def runStartup(devices, parameters, rounds=5):
+    # cold import and onStart with devices already present, best of rounds
+    if not parameters.get("HomeFolder"):
+        parameters = dict(parameters, HomeFolder=tempfile.mkdtemp(prefix="udpdiscovery-bench-") + os.sep)
+    importTimes = []
+    startTimes = []
+    for i in range(rounds):
+        purgePluginModules()
+        Domoticz.reset()
+        Domoticz.Parameters.update(parameters)
+        for unit in range(1, devices + 1):
+            Domoticz.Device("Temperature", unit, "Temperature", DeviceID=nodeMac(unit)).Create()
+        start = time.perf_counter()
+        plugin = importlib.import_module("plugin")
+        imported = time.perf_counter()
+        Domoticz.install(plugin)
+        plugin.onStart()
+        started = time.perf_counter()
+        plugin.onStop()
+        importTimes.append((imported - start) * 1000.0)
+        startTimes.append((started - imported) * 1000.0)
+    return {"devices": devices, "importMs": min(importTimes), "onStartMs": min(startTimes),
+            "logLines": Domoticz.logCount, "lookupNs": lookupCost()}
+
+def lookupCost(number=1000000):
+    # ns per constant lookup and compare, as done per packet
+    import mySensorsConst
+    import mySensorsIds
+    cost = {}
+    for name, module in (("enum", mySensorsConst), ("int", mySensorsIds)):
+        seconds = timeit.timeit("cmdType == const.Internal.I_TIME", number=number,
+                                globals={"const": module, "cmdType": 1})
+        cost[name] = seconds / number * 1e9
+    return cost
+
+def printStartup(result):
+    print("startup with %d devices: import %.1f ms, onStart %.1f ms, log lines %d" % (
+        result["devices"], result["importMs"], result["onStartMs"], result["logLines"]))
+    print("constant lookup: IntEnum %.1f ns, plain int %.1f ns" % (result["lookupNs"]["enum"], result["lookupNs"]["int"]))
+
+def parseMix(text):
+    mix = {}
+    for item in text.split(","):
+        protocol, sep, weight = item.partition("=")
+        if protocol not in PROTOCOLS:
+            raise argparse.ArgumentTypeError("unknown protocol: " + protocol)
+        mix[protocol] = float(weight) if sep else 1.0
+    return mix
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay traffic through plugin.py")
+    parser.add_argument("--nodes", type=int, default=50, help="number of synthetic nodes/hosts")
+    parser.add_argument("--packets", type=int, default=20000, help="number of synthetic packets")
+    parser.add_argument("--mix", type=parseMix, default={"mysensors": 1.0},
+                        help="protocol weights, e.g. mysensors=8,ssdp=1,ddd=1")
+    parser.add_argument("--rate", type=float, default=0, help="packets per second, 0 = unpaced")
+    parser.add_argument("--heartbeat", type=float, default=None, help="seconds between onHeartbeat calls")
+    parser.add_argument("--replay", help="replay datagrams from file instead of synthetic traffic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="override hardware parameter, e.g. Mode6=Debug")
+    parser.add_argument("--pipeline", type=int, default=None, metavar="WORKERS",
+                        help="run in pipeline mode with this many decode workers")
+    parser.add_argument("--scaling", default=None, metavar="WORKERS,...",
+                        help="compare worker counts, e.g. 0,1,2,4 (0 = no pipeline)")
+    parser.add_argument("--send", default=None, metavar="HOST:PORT",
+                        help="send the traffic to a running gateway.py instead of calling the plugin")
+    parser.add_argument("--startup", type=int, default=None, metavar="DEVICES",
+                        help="measure import and onStart with DEVICES devices instead of traffic")
+    parser.add_argument("--tracemalloc", action="store_true", help="measure allocations (slower)")
+    parser.add_argument("--json", action="store_true", help="print result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="print plugin log")
+    args = parser.parse_args(argv)
+
+    parameters = dict(DEFAULT_PARAMETERS)
+    for item in args.param:
+        key, sep, value = item.partition("=")
+        parameters[key] = value
+    if args.pipeline is not None:
+        parameters["Mode4"] = parameters.get("Mode4", "") + ";pipeline=" + str(args.pipeline)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(levelname)s: %(message)s")
+    if args.startup is not None:
+        result = runStartup(args.startup, parameters)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            printStartup(result)
+        return
+    if args.send:
+        traffic = replayTraffic(args.replay) if args.replay else syntheticTraffic(args.nodes, args.packets, args.mix, args.seed)
+        result = sendTraffic(traffic, args.send, args.rate)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print("sent: %d in %.3f s -> %.0f packets/s" % (result["packets"], result["seconds"], result["packetsPerSecond"]))
+        return
+    if args.scaling:
+        runScaling(args, parameters, [int(workers) for workers in args.scaling.split(",")])
+        return
+    if args.replay:
+        traffic = replayTraffic(args.replay)
+    else:
+        traffic = syntheticTraffic(args.nodes, args.packets, args.mix, args.seed)
+    result = runBenchmark(traffic, parameters, args.rate, args.heartbeat, args.tracemalloc)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        printResult(result)
+
+def runScaling(args, parameters, workerCounts):
+    # same traffic for every worker count, onMessage latency is what the
+    # Domoticz callback thread sees
+    results = {}
+    for workers in workerCounts:
+        runParameters = dict(parameters, Mode4=parameters.get("Mode4", "") + ";pipeline=" + str(workers))
+        if args.replay:
+            traffic = replayTraffic(args.replay)
+        else:
+            traffic = syntheticTraffic(args.nodes, args.packets, args.mix, args.seed)
+        results[workers] = runBenchmark(traffic, runParameters, args.rate, args.heartbeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("%-8s %12s %14s %14s %10s" % ("workers", "packets/s", "onMessage p50", "onMessage p99", "devices"))
+    for workers, result in results.items():
+        total = result["stages"]["total"]
+        print("%-8d %12.0f %14.1f %14.1f %10d" % (workers, result["packetsPerSecond"], total["p50"], total["p99"], result["devices"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Off-thread decoding of received datagrams."""
+import threading
+from collections import deque
+
+class DecodePipeline:
+    """Decodes datagrams on worker threads.
+
+    The Domoticz callback thread only calls submit(), which puts the raw
+    datagram into a bounded queue. Worker threads decode it with the decoder
+    registered for the name of the connection it arrived on, and drain()
+    hands (Connection, decoded) pairs back to the callback thread in
+    batches. When the queue is full either the oldest queued datagram or
+    the new one is dropped. With more than one worker, datagrams can be
+    decoded out of order. The callback thread never waits for workers, it
+    drains whatever is decoded when it runs anyway.
+    """
+
+    BATCH = 64      # datagrams taken from the queue at once by a worker
+
+    def __init__(self,decoders,defaultDecoder,workers=1,capacity=4096,dropOldest=True):
+        self.decoders = decoders
+        self.defaultDecoder = defaultDecoder
+        self.capacity = capacity
+        self.dropOldest = dropOldest
+        self.inbox = deque()
+        self.outbox = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.busy = 0
+        self.threads = [threading.Thread(target=self.run, name="DecodePipeline-" + str(i), daemon=True)
+                        for i in range(workers)]
+        # counters
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        return
+
+    def start(self):
+        self.running = True
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self,timeout=5):
+        # workers finish queued datagrams before they exit
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def submit(self,Connection,Data):
+        # returns False when the datagram was dropped
+        with self.condition:
+            self.submitted += 1
+            if len(self.inbox) >= self.capacity:
+                self.dropped += 1
+                if not self.dropOldest:
+                    return False
+                self.inbox.popleft()
+            self.inbox.append((Connection, Data))
+            self.condition.notify()
+        return True
+
+    def pending(self):
+        # datagrams submitted but not yet drained
+        return len(self.inbox) + self.busy + len(self.outbox)
+
+    def run(self):
+        inbox = self.inbox
+        outbox = self.outbox
+        while True:
+            with self.condition:
+                while not inbox and self.running:
+                    self.condition.wait()
+                if not inbox:
+                    return
+                batch = [inbox.popleft() for i in range(min(len(inbox), self.BATCH))]
+                self.busy += len(batch)
+            for Connection, Data in batch:
+                try:
+                    decoded = self.decoders.get(Connection.Name, self.defaultDecoder)(Data)
+                except Exception:
+                    self.errors += 1
+                    decoded = None
+                outbox.append((Connection, decoded))
+            with self.condition:
+                self.busy -= len(batch)
+
+    def drain(self,limit=None):
+        # decoded datagrams for the callback thread, oldest first
+        outbox = self.outbox
+        count = len(outbox) if limit is None else min(limit, len(outbox))
+        return [outbox.popleft() for i in range(count)]
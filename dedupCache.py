@@ -0,0 +1,54 @@
+"""Short-lived memory of received datagrams to drop repeated copies."""
+import time
+
+class DedupCache:
+    """Last datagram of every source, kept for window seconds.
+
+    A datagram is a copy only when it equals the last one from the same
+    source, so A, B, A within the window are all handled while a burst of
+    retransmits of A is not. The datagram is compared raw, not as a digest,
+    so different datagrams are never taken for copies. At most maxEntries
+    sources are kept, the least recently heard one is forgotten first.
+
+    When the first copy was accepted and acked, the ack sent for it is
+    kept with the datagram so that copies get the very same ack and
+    nothing else does.
+    """
+
+    def __init__(self,window=1.0,maxEntries=4096):
+        self.window = window
+        self.maxEntries = maxEntries
+        self.last = {}          # source -> [data, expiry time, ack], oldest first
+        # counters
+        self.duplicates = 0
+        return
+
+    def __len__(self):
+        return len(self.last)
+
+    def seen(self,source,data,now=None):
+        # returns True when data repeats the last datagram of source within window
+        if now is None:
+            now = time.monotonic()
+        last = self.last.pop(source, None)
+        if last is not None and last[0] == data and now < last[1]:
+            # expiry stays the one of the first copy
+            self.last[source] = last
+            self.duplicates += 1
+            return True
+        self.last[source] = [data, now + self.window, None]
+        if len(self.last) > self.maxEntries:
+            del self.last[next(iter(self.last))]
+        return False
+
+    def acked(self,source,ack):
+        # remember ack sent for the last datagram of source, ignored when
+        # that datagram is not the one acked (a newer one replaced it)
+        last = self.last.get(source)
+        if last is not None and last[0].rstrip(b"\r\n") == ack:
+            last[2] = ack
+
+    def ackFor(self,source):
+        # ack sent for the last datagram of source, None if it was not acked
+        last = self.last.get(source)
+        return last[2] if last is not None else None
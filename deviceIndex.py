@@ -0,0 +1,71 @@
+"""In-memory index of Domoticz devices by unit and unique (hardware) ID."""
+# highest unit Domoticz allows for one hardware
+MAX_UNIT = 255
+
+class DeviceIndex:
+    """Keeps uniqueID -> nodeID and unit -> DeviceID maps in step with Devices.
+
+    Built once from Devices at onStart and updated incrementally when
+    devices are created or removed, so neither free units nor the nodeIDs
+    of nodes numbered by unit in earlier versions need a scan of Devices.
+    """
+
+    def __init__(self):
+        self.units = {}         # unit -> DeviceID
+        self.uniqueUnits = {}   # DeviceID -> set of units with that DeviceID
+        self.nodeIDs = {}       # DeviceID -> lowest unit, the legacy nodeID
+        self.highestUnit = 0    # highest unit used by a device
+        return
+
+    def build(self,Devices):
+        self.__init__()
+        for unit in Devices:
+            self.deviceAdded(unit, Devices[unit].DeviceID)
+
+    def __len__(self):
+        return len(self.units)
+
+    def __contains__(self,unit):
+        return unit in self.units
+
+    def deviceAdded(self,unit,deviceID):
+        self.units[unit] = deviceID
+        self.uniqueUnits.setdefault(deviceID, set()).add(unit)
+        # node keeps the lowest unit of its devices as nodeID
+        nodeID = self.nodeIDs.get(deviceID)
+        if nodeID is None or unit < nodeID:
+            self.nodeIDs[deviceID] = unit
+        if unit > self.highestUnit:
+            self.highestUnit = unit
+
+    def deviceRemoved(self,unit):
+        deviceID = self.units.pop(unit, None)
+        if deviceID is None:
+            return
+        units = self.uniqueUnits[deviceID]
+        units.discard(unit)
+        if not units:
+            del self.uniqueUnits[deviceID]
+            del self.nodeIDs[deviceID]
+        elif self.nodeIDs[deviceID] == unit:
+            self.nodeIDs[deviceID] = min(units)
+        if unit == self.highestUnit:
+            # only removal of the highest unit needs a rescan
+            self.highestUnit = max(self.units, default=0)
+
+    def unitsFor(self,deviceID):
+        return self.uniqueUnits.get(deviceID, ())
+
+    def nextFreeUnit(self,reserved=()):
+        # units above highestUnit first, gaps once those are used up;
+        # None when all units are taken
+        for unit in range(self.highestUnit + 1, MAX_UNIT + 1):
+            if unit not in reserved:
+                return unit
+        for unit in range(1, self.highestUnit):
+            if unit not in self.units and unit not in reserved:
+                return unit
+        return None
+
+    def legacyNodeID(self,uniqueID):
+        return self.nodeIDs.get(uniqueID)
@@ -0,0 +1,69 @@
+"""Coalescing write-behind cache for Domoticz device updates."""
+import time
+
+class DeviceUpdateCache:
+    """Keeps only the latest value per unit and writes it out in batches.
+
+    writer(Unit, nValue, sValue, AlwaysUpdate) does the actual device update
+    and returns True when the device was written (False when the value was
+    unchanged).
+    minPeriods maps an update type (as passed to update()) to the minimum
+    number of seconds between two writes of the same unit. Updates of the
+    immediateTypes (switch states, events) are written at once instead.
+    """
+
+    def __init__(self,writer,interval=10,minPeriods=None,immediateTypes=()):
+        self.writer = writer
+        self.interval = interval
+        self.minPeriods = minPeriods if minPeriods is not None else {}
+        self.immediateTypes = frozenset(immediateTypes)
+        self.pending = {}       # unit -> (nValue, sValue, minimum period)
+        self.lastWrite = {}     # unit -> time of last write
+        self.nextFlush = 0
+        # counters
+        self.flushed = 0        # writes issued to Domoticz
+        self.suppressed = 0     # updates coalesced or dropped as unchanged
+        return
+
+    def update(self,Unit,nValue,sValue,updateType=None,now=None):
+        if Unit in self.pending:
+            # older pending value is overwritten and never written
+            self.suppressed += 1
+        if updateType in self.immediateTypes:
+            self.pending.pop(Unit, None)
+            if self.writer(Unit, nValue, sValue, False):
+                self.flushed += 1
+                self.lastWrite[Unit] = time.monotonic() if now is None else now
+            else:
+                self.suppressed += 1
+            return
+        self.pending[Unit] = (nValue, sValue, self.minPeriods.get(updateType, 0))
+
+    def write(self,Unit,nValue,sValue,now=None):
+        # write through immediately (always update), drops pending value
+        if now is None:
+            now = time.monotonic()
+        if self.pending.pop(Unit, None) is not None:
+            self.suppressed += 1
+        self.writer(Unit, nValue, sValue, True)
+        self.flushed += 1
+        self.lastWrite[Unit] = now
+
+    def isDue(self,now):
+        return bool(self.pending) and now >= self.nextFlush
+
+    def flush(self,now=None,force=False):
+        if now is None:
+            now = time.monotonic()
+        lastWrite = self.lastWrite
+        for Unit, (nValue, sValue, minPeriod) in list(self.pending.items()):
+            if not force and minPeriod and now - lastWrite.get(Unit, -minPeriod) < minPeriod:
+                # keep it pending until minimum period has passed
+                continue
+            del self.pending[Unit]
+            if self.writer(Unit, nValue, sValue, False):
+                self.flushed += 1
+                lastWrite[Unit] = now
+            else:
+                self.suppressed += 1
+        self.nextFlush = now + self.interval
@@ -0,0 +1,125 @@
+"""Parsers for SSDP and Dynamic Device Discovery (DDD) announcements."""
+class SsdpMessage:
+    """SSDP datagram with headers parsed incrementally on first access.
+
+    Only the start line is split when the message is created; header lines
+    are parsed up to the one asked for, so looking up USN does not decode
+    the rest of the datagram.
+    """
+    __slots__ = ("data", "startLine", "headers", "offset")
+
+    METHODS = (b"NOTIFY ", b"M-SEARCH ", b"HTTP/1.1 ")
+
+    def __init__(self,data,startLine,offset):
+        self.data = data
+        self.startLine = startLine
+        self.headers = {}       # lower case name -> value (bytes)
+        self.offset = offset    # start of first header line not parsed yet
+
+    @classmethod
+    def fromBytes(cls,data):
+        # returns None if data is not an SSDP datagram
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if not data.startswith(cls.METHODS):
+            return None
+        end = data.find(b"\r\n")
+        if end < 0:
+            return None
+        return cls(data, data[:end], end + 2)
+
+    def header(self,name,default=None):
+        name = name.lower().encode("ascii")
+        value = self.headers.get(name)
+        if value is not None:
+            return value.decode("utf-8", "ignore")
+        data = self.data
+        while self.offset < len(data):
+            end = data.find(b"\r\n", self.offset)
+            if end < 0:
+                end = len(data)
+            line = data[self.offset:end]
+            self.offset = end + 2
+            if not line:
+                # empty line ends the headers
+                self.offset = len(data)
+                break
+            key, sep, value = line.partition(b":")
+            key = key.strip().lower()
+            value = value.strip()
+            self.headers[key] = value
+            if key == name:
+                return value.decode("utf-8", "ignore")
+        return default
+
+    @property
+    def method(self):
+        return self.startLine.split(b" ", 1)[0].decode("ascii", "ignore")
+
+    @property
+    def announcement(self):
+        # NOTIFY or search response, M-SEARCH only asks for announcements
+        return not self.startLine.startswith(b"M-SEARCH ")
+
+    @property
+    def usn(self):
+        return self.header("USN")
+
+    @property
+    def location(self):
+        return self.header("LOCATION")
+
+    @property
+    def alive(self):
+        # ssdp:byebye announces that the device is leaving
+        return self.header("NTS") != "ssdp:byebye"
+
+    @property
+    def maxAge(self):
+        # seconds from CACHE-CONTROL: max-age=N, None if not present
+        cacheControl = self.header("CACHE-CONTROL")
+        if cacheControl:
+            for directive in cacheControl.split(","):
+                key, sep, value = directive.strip().partition("=")
+                if key.lower() == "max-age":
+                    try:
+                        return int(value)
+                    except ValueError:
+                        return None
+        return None
+
+class DddBeacon:
+    """AMX Dynamic Device Discovery beacon, 'AMXB<-Key=Value>...'.
+
+    Fields are looked up directly in the received bytes when accessed.
+    """
+    __slots__ = ("data",)
+
+    PREFIX = b"AMXB"
+
+    def __init__(self,data):
+        self.data = data
+
+    @classmethod
+    def fromBytes(cls,data):
+        # returns None if data is not a DDD beacon
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if not data.startswith(cls.PREFIX):
+            return None
+        return cls(data)
+
+    def field(self,name,default=None):
+        marker = b"<-" + name.encode("ascii") + b"="
+        start = self.data.find(marker)
+        if start < 0:
+            return default
+        start += len(marker)
+        end = self.data.find(b">", start)
+        if end < 0:
+            end = len(self.data)
+        return self.data[start:end].decode("utf-8", "ignore")
+
+    @property
+    def uuid(self):
+        return self.field("UUID")
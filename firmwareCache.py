@@ -0,0 +1,121 @@
+"""Firmware images for MySensors OTA updates, loaded once and served by block."""
+import binascii
+import os
+import struct
+
+FIRMWARE_BLOCK_SIZE = 16
+# images are padded to a multiple of this with 0xFF, like the bootloader expects
+FIRMWARE_PAD_SIZE = 128
+
+# Unpack little endian 16 bit words from hex payload
+def hexToWords(payload, words):
+    return struct.unpack("<%dH" % words, binascii.unhexlify(payload[:words * 4]))
+
+# Pack 16 bit words into hex payload
+def wordsToHex(*words):
+    return binascii.hexlify(struct.pack("<%dH" % len(words), *words)).decode("ascii").upper()
+
+# CRC16 used by the MySensors bootloader
+def computeCrc(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for i in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+# Read Intel HEX file into bytes
+def readIntelHex(fileName):
+    data = bytearray()
+    base = 0
+    with open(fileName, "r") as hexFile:
+        for line in hexFile:
+            line = line.strip()
+            if not line.startswith(":"):
+                continue
+            record = binascii.unhexlify(line[1:])
+            length, address, recordType = record[0], (record[1] << 8) | record[2], record[3]
+            payload = record[4:4 + length]
+            if recordType == 0:
+                start = base + address
+                if len(data) < start:
+                    data.extend(b"\xff" * (start - len(data)))
+                data[start:start + length] = payload
+            elif recordType == 1:
+                break
+            elif recordType == 2:
+                base = ((payload[0] << 8) | payload[1]) << 4
+            elif recordType == 4:
+                base = ((payload[0] << 8) | payload[1]) << 16
+    return bytes(data)
+
+class FirmwareImage:
+    """Padded firmware with block responses encoded on first use."""
+    __slots__ = ("fwType", "fwVersion", "data", "blocks", "crc", "responses")
+
+    def __init__(self,fwType,fwVersion,data):
+        pad = len(data) % FIRMWARE_PAD_SIZE
+        if pad:
+            data += b"\xff" * (FIRMWARE_PAD_SIZE - pad)
+        self.fwType = fwType
+        self.fwVersion = fwVersion
+        self.data = data
+        self.blocks = len(data) // FIRMWARE_BLOCK_SIZE
+        self.crc = computeCrc(data)
+        self.responses = [None] * self.blocks
+
+    def configPayload(self):
+        return wordsToHex(self.fwType, self.fwVersion, self.blocks, self.crc)
+
+    def blockPayload(self,block):
+        # ST_FIRMWARE_RESPONSE payload, encoded once per block
+        payload = self.responses[block]
+        if payload is None:
+            start = block * FIRMWARE_BLOCK_SIZE
+            payload = self.responses[block] = (wordsToHex(self.fwType, self.fwVersion, block) +
+                    binascii.hexlify(self.data[start:start + FIRMWARE_BLOCK_SIZE]).decode("ascii").upper())
+        return payload
+
+class FirmwareCache:
+    """Firmware images from folder/<type>/<version>.hex, keyed by (type, version).
+
+    Each image is read once; the newest version of a type is looked up again
+    only when the type's folder changes.
+    """
+
+    def __init__(self,folder):
+        self.folder = folder
+        self.images = {}        # (type, version) -> FirmwareImage
+        self.latestVersions = {}  # type -> (folder mtime, newest version)
+        return
+
+    def latest(self,fwType):
+        # newest version available for firmware type, None if there is none
+        typeFolder = os.path.join(self.folder, str(fwType))
+        try:
+            mtime = os.stat(typeFolder).st_mtime
+        except OSError:
+            return None
+        cached = self.latestVersions.get(fwType)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        versions = []
+        for fileName in os.listdir(typeFolder):
+            name, ext = os.path.splitext(fileName)
+            if ext.lower() == ".hex" and name.isdigit():
+                versions.append(int(name))
+        version = max(versions) if versions else None
+        self.latestVersions[fwType] = (mtime, version)
+        return version
+
+    def get(self,fwType,fwVersion):
+        image = self.images.get((fwType, fwVersion))
+        if image is None:
+            fileName = os.path.join(self.folder, str(fwType), str(fwVersion) + ".hex")
+            if not os.path.isfile(fileName):
+                return None
+            image = self.images[(fwType, fwVersion)] = FirmwareImage(fwType, fwVersion, readIntelHex(fileName))
+        return image
@@ -0,0 +1,204 @@
+"""Standalone asyncio UDP gateway running the plugin's protocol core.
+
+    python3 gateway.py --mode1 255.255.255.255:9009 --home ./gateway --sink file:updates.jsonl
+
+plugin.py is loaded with gatewayDomoticz as its Domoticz module, so
+parsing, dispatch, the node registry and unit allocation are the same code
+that runs inside Domoticz. Device updates are forwarded in batches to a
+file sink (JSON lines) or to Domoticz through its JSON API.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+import urllib.parse
+import urllib.request
+import gatewayDomoticz
+
+# plugin.py imports Domoticz, which has to be in place first
+sys.modules.setdefault("Domoticz", gatewayDomoticz)
+
+import plugin
+
+class FileSink:
+    """Appends device updates to a file as JSON lines."""
+
+    def __init__(self,fileName):
+        self.fileName = fileName
+        self.written = 0
+
+    def write(self,batch):
+        with open(self.fileName, "a") as sinkFile:
+            sinkFile.write("".join(json.dumps(update) + "\n" for update in batch))
+        self.written += len(batch)
+
+class DomoticzSink:
+    """Sends device updates to Domoticz with the udevice JSON API command.
+
+    idxMap maps gateway units to Domoticz device idx; updates of units
+    without idx are counted and skipped. Only the latest update of a unit
+    in a batch is sent.
+    """
+
+    def __init__(self,url,idxMap,timeout=5):
+        self.url = url.rstrip("/") + "/json.htm"
+        self.idxMap = idxMap
+        self.timeout = timeout
+        self.written = 0
+        self.unmapped = 0
+
+    def write(self,batch):
+        latest = {update["unit"]: update for update in batch}
+        for unit, update in latest.items():
+            idx = self.idxMap.get(str(unit))
+            if idx is None:
+                self.unmapped += 1
+                continue
+            query = urllib.parse.urlencode({"type": "command", "param": "udevice", "idx": idx,
+                                            "nvalue": update["nValue"], "svalue": update["sValue"]})
+            with urllib.request.urlopen(self.url + "?" + query, timeout=self.timeout) as response:
+                response.read()
+            self.written += 1
+
+# Create sink from 'file:<name>' or 'domoticz:<url>'
+def createSink(text, idxMapFile=None):
+    kind, sep, target = text.partition(":")
+    if kind == "file":
+        return FileSink(target)
+    if kind == "domoticz":
+        idxMap = {}
+        if idxMapFile:
+            with open(idxMapFile, "r") as mapFile:
+                idxMap = json.load(mapFile)
+        return DomoticzSink(target, idxMap)
+    raise ValueError("unknown sink: " + text)
+
+class Gateway:
+    """Runs the plugin callbacks on an asyncio event loop.
+
+    Devices are kept in HomeFolder/gateway_devices.json between runs, the
+    node registry is the plugin's own nodes_<HardwareID>.json.
+    """
+
+    def __init__(self,parameters,sink,batchSize=500,flushInterval=1.0):
+        self.parameters = parameters
+        self.sink = sink
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.stateFile = os.path.join(parameters["HomeFolder"], "gateway_devices.json")
+        self.flushing = None
+        self.datagrams = 0
+        self.firstReceived = self.lastReceived = 0.0
+        return
+
+    def loadDevices(self):
+        try:
+            with open(self.stateFile, "r") as stateFile:
+                for record in json.load(stateFile):
+                    gatewayDomoticz.Device.fromDict(record).Create()
+        except FileNotFoundError:
+            pass
+
+    def saveDevices(self):
+        tempName = self.stateFile + ".tmp"
+        with open(tempName, "w") as stateFile:
+            json.dump([device.toDict() for device in gatewayDomoticz.Devices.values()], stateFile)
+        os.replace(tempName, self.stateFile)
+
+    def receive(self,Connection,Data):
+        self.lastReceived = time.monotonic()
+        if not self.datagrams:
+            self.firstReceived = self.lastReceived
+        self.datagrams += 1
+        plugin.onMessage(Connection, Data)
+        if len(gatewayDomoticz.updates) >= self.batchSize and self.flushing is None:
+            self.flushing = asyncio.get_event_loop().create_task(self.flush())
+
+    async def flush(self):
+        # sink runs on an executor thread, the loop keeps receiving
+        try:
+            while gatewayDomoticz.updates:
+                batch = gatewayDomoticz.updates
+                gatewayDomoticz.updates = []
+                try:
+                    await asyncio.get_event_loop().run_in_executor(None, self.sink.write, batch)
+                except Exception as inst:
+                    gatewayDomoticz.logger.error("Sink failed, %d updates lost: %s", len(batch), inst)
+        finally:
+            self.flushing = None
+
+    async def every(self,interval,callback):
+        while True:
+            await asyncio.sleep(interval())
+            callback()
+
+    async def run(self,duration=None):
+        loop = asyncio.get_event_loop()
+        stop = asyncio.Event()
+        for signalNumber in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signalNumber, stop.set)
+            except NotImplementedError:
+                pass
+        gatewayDomoticz.Parameters.update(self.parameters)
+        gatewayDomoticz.install(plugin)
+        gatewayDomoticz.receiver = self.receive
+        self.loadDevices()
+        plugin.onStart()
+        tasks = [loop.create_task(self.every(lambda: gatewayDomoticz.heartbeat, plugin.onHeartbeat)),
+                 loop.create_task(self.every(lambda: self.flushInterval, self.startFlush))]
+        try:
+            await asyncio.wait_for(stop.wait(), duration)
+        except asyncio.TimeoutError:
+            pass
+        for task in tasks:
+            task.cancel()
+        plugin.onStop()
+        if self.flushing is not None:
+            await self.flushing
+        await self.flush()
+        self.saveDevices()
+        elapsed = self.lastReceived - self.firstReceived
+        gatewayDomoticz.logger.info("Gateway received %d datagrams in %.1f s (%.0f/s), forwarded %d updates",
+                                    self.datagrams, elapsed, self.datagrams / elapsed if elapsed else 0.0,
+                                    self.sink.written)
+
+    def startFlush(self):
+        if gatewayDomoticz.updates and self.flushing is None:
+            self.flushing = asyncio.get_event_loop().create_task(self.flush())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MySensors/discovery protocol core as a UDP gateway")
+    parser.add_argument("--mode1", default="255.255.255.255:9009", help="discovery type, address:port or All")
+    parser.add_argument("--home", default=".", help="folder for node registry, devices and firmware")
+    parser.add_argument("--hardware-id", default="0", help="HardwareID used in file names, one per shard")
+    parser.add_argument("--options", default="", help="plugin Options (Mode4), e.g. rateLimit=0;shard=0/2")
+    parser.add_argument("--update-interval", default="10", help="device update interval in seconds (Mode3)")
+    parser.add_argument("--log-level", default="Normal", choices=("Debug", "Normal", "Errors"))
+    parser.add_argument("--sink", default="file:updates.jsonl", help="file:<name> or domoticz:<url>")
+    parser.add_argument("--idx-map", help="JSON file mapping units to Domoticz idx for the domoticz sink")
+    parser.add_argument("--batch", type=int, default=500, help="updates forwarded at once")
+    parser.add_argument("--flush", type=float, default=1.0, help="seconds between forwarding updates")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.log_level == "Debug" else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    parameters = {
+        "Name": "UDP Discovery gateway",
+        "HomeFolder": os.path.join(os.path.abspath(args.home), ""),
+        "HardwareID": args.hardware_id,
+        "Mode1": args.mode1,
+        "Mode2": "True",
+        "Mode3": args.update_interval,
+        "Mode4": args.options,
+        "Mode6": args.log_level,
+    }
+    gateway = Gateway(parameters, createSink(args.sink, args.idx_map), args.batch, args.flush)
+    asyncio.run(gateway.run(args.duration))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""The parts of the Domoticz plugin API used by plugin.py, on asyncio.
+
+gateway.py installs this module as Domoticz before it imports plugin.py,
+so the plugin runs unchanged outside of Domoticz. Listening connections are
+asyncio datagram endpoints and device updates are collected in updates for
+the gateway to forward in batches. The benchmark's Domoticz module builds
+on this one and only replaces the connections.
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import struct
+import time
+import mySensorsValues as values
+
+Devices = {}
+Parameters = {}
+
+heartbeat = 10
+RECEIVE_BUFFER = 4 * 1024 * 1024
+receiver = None     # called as receiver(Connection, Data), set by the gateway
+updates = []        # device updates not yet forwarded
+logger = logging.getLogger("gateway")
+debugging = 0
+# log lines, errors included
+logCount = 0
+errorCount = 0
+
+def Log(message):
+    global logCount
+    logCount += 1
+    logger.info(message)
+
+def Status(message):
+    Log(message)
+
+def Debug(message):
+    global logCount
+    if debugging:
+        logCount += 1
+        logger.debug(message)
+
+def Error(message):
+    global logCount, errorCount
+    logCount += 1
+    errorCount += 1
+    logger.error(message)
+
+def Debugging(level):
+    global debugging
+    debugging = level
+
+def Heartbeat(seconds):
+    global heartbeat
+    heartbeat = seconds
+
+class ListenerProtocol(asyncio.DatagramProtocol):
+    """Hands datagrams received by a listener to receiver."""
+
+    def __init__(self,listener):
+        self.listener = listener
+        self.sources = {}       # (address, port) -> Connection
+
+    def connection_made(self,transport):
+        self.listener.transport = transport
+        # sent by onStart before the endpoint was open
+        for data, address in self.listener.unsent:
+            transport.sendto(data, address)
+        self.listener.unsent = []
+
+    def datagram_received(self,data,addr):
+        # one connection per sender, like Domoticz does for UDP
+        source = self.sources.get(addr)
+        if source is None:
+            source = self.sources[addr] = Connection(self.listener.Name, self.listener.Transport,
+                                                     Address=addr[0], Port=str(addr[1]))
+            source.listener = self.listener
+        receiver(source, data)
+
+    def error_received(self,exc):
+        logger.error("Listener %s: %s", self.listener.Name, exc)
+
+class Connection:
+    def __init__(self, Name, Transport, Protocol="None", Address="", Port="", Baud=0):
+        self.Name = Name
+        self.Transport = Transport
+        self.Protocol = Protocol
+        self.Address = Address
+        self.Port = Port
+        self.transport = None
+        self.unsent = []
+        self.listener = self    # connection whose socket sends for this one
+
+    def Listen(self):
+        # bind to the port on all interfaces, join the group when multicast
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # room for bursts while the loop is busy in a callback
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        sock.bind(("", int(self.Port)))
+        if ipaddress.ip_address(self.Address).is_multicast:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                            struct.pack("4s4s", socket.inet_aton(self.Address), socket.inet_aton("0.0.0.0")))
+        sock.setblocking(False)
+        loop = asyncio.get_event_loop()
+        loop.create_task(loop.create_datagram_endpoint(lambda: ListenerProtocol(self), sock=sock))
+
+    def Connected(self):
+        return self.transport is not None
+
+    def Disconnect(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def Send(self, Message, Delay=0):
+        if isinstance(Message, str):
+            Message = Message.encode("utf-8")
+        transport = self.listener.transport
+        if transport is None:
+            self.listener.unsent.append((Message, (self.Address, int(self.Port))))
+            return
+        transport.sendto(Message, (self.Address, int(self.Port)))
+
+# Domoticz (Type, SubType) of the device types plugin.py reads back
+TYPE_IDS = {typeName: (Type, SubType or 0) for (Type, SubType), typeName in values.DEVICE_TYPE_NAMES.items()}
+
+class Device:
+    def __init__(self, Name="", Unit=0, TypeName="Custom", DeviceID="", Image=0,
+                 Options=None, Used=0, Type=0, Subtype=0, Switchtype=0, Description=""):
+        self.Name = Name
+        self.Unit = Unit
+        self.TypeName = TypeName
+        self.DeviceID = DeviceID
+        self.ID = Unit
+        self.Image = Image
+        self.Options = Options or {}
+        self.Used = Used
+        self.Type, self.SubType = TYPE_IDS.get(TypeName, (Type or 243, Subtype))
+        self.SwitchType = Switchtype
+        self.Description = Description
+        self.nValue = 0
+        self.sValue = ""
+        self.LastLevel = 0
+        self.updateCount = 0
+
+    def __str__(self):
+        return "Unit: %d, Name: '%s', nValue: %d, sValue: '%s'" % (self.Unit, self.Name, self.nValue, self.sValue)
+
+    def Create(self):
+        Devices[self.Unit] = self
+
+    def Update(self, nValue, sValue, **kwargs):
+        self.nValue = nValue
+        self.sValue = sValue
+        self.updateCount += 1
+        updates.append({"time": time.time(), "unit": self.Unit, "deviceID": self.DeviceID,
+                        "name": self.Name, "nValue": nValue, "sValue": sValue})
+
+    def Delete(self):
+        Devices.pop(self.Unit, None)
+
+    def toDict(self):
+        return {"unit": self.Unit, "name": self.Name, "typeName": self.TypeName, "deviceID": self.DeviceID,
+                "nValue": self.nValue, "sValue": self.sValue}
+
+    @classmethod
+    def fromDict(cls, record):
+        device = cls(record["name"], record["unit"], record["typeName"], DeviceID=record["deviceID"])
+        device.nValue = record["nValue"]
+        device.sValue = record["sValue"]
+        return device
+
+# Put Devices and Parameters into the plugin module, as Domoticz does
+def install(module):
+    module.Devices = Devices
+    module.Parameters = Parameters
+
+def reset():
+    # clear state between plugin runs
+    global updates, logCount, errorCount
+    Devices.clear()
+    Parameters.clear()
+    updates = []
+    logCount = 0
+    errorCount = 0
@@ -0,0 +1,67 @@
+"""Cache of hosts discovered through SSDP and DDD announcements."""
+import time
+from collections import OrderedDict
+
+class HostEntry:
+    """One announced service: (address, hostID) and what it announced."""
+    __slots__ = ("address", "hostID", "info", "expires")
+
+    def __init__(self,address,hostID,info,expires):
+        self.address = address
+        self.hostID = hostID    # SSDP USN or DDD UUID
+        self.info = info
+        self.expires = expires
+
+class HostCache:
+    """Announced hosts with max-age/TTL based expiry and a size bound.
+
+    announce() reports whether the host is new or announced something
+    different, so repeated identical announcements cost one dict lookup.
+    Expired entries are dropped by expire(), and the least recently
+    announced entry is dropped when maxHosts is reached.
+    """
+
+    def __init__(self,maxHosts=512,defaultTtl=1800):
+        self.maxHosts = maxHosts
+        self.defaultTtl = defaultTtl
+        self.entries = OrderedDict()    # (address, hostID) -> HostEntry
+        # counters
+        self.unchanged = 0
+        self.evicted = 0
+        return
+
+    def __len__(self):
+        return len(self.entries)
+
+    def announce(self,address,hostID,info,ttl=None,now=None):
+        # returns True when host is new or its info changed
+        if now is None:
+            now = time.monotonic()
+        expires = now + (ttl if ttl is not None else self.defaultTtl)
+        key = (address, hostID)
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.expires = expires
+            self.entries.move_to_end(key)
+            if entry.info == info:
+                self.unchanged += 1
+                return False
+            entry.info = info
+            return True
+        if len(self.entries) >= self.maxHosts:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+        self.entries[key] = HostEntry(address, hostID, info, expires)
+        return True
+
+    def remove(self,address,hostID):
+        return self.entries.pop((address, hostID), None)
+
+    def expire(self,now=None):
+        if now is None:
+            now = time.monotonic()
+        expired = [key for key, entry in self.entries.items() if entry.expires <= now]
+        for key in expired:
+            del self.entries[key]
+        self.evicted += len(expired)
+        return len(expired)
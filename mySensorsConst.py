@@ -241,4 +241,48 @@ class Stream(IntEnum):
     ST_FIRMWARE_REQUEST = 2  # Request FW block
     ST_FIRMWARE_RESPONSE = 3  # Response FW block
     ST_SOUND = 4  # Sound
-    ST_IMAGE = 5  # Image
\ No newline at end of file
+    ST_IMAGE = 5  # Image
+
+
+# sub-type enum used by each message type
+SUB_TYPES = {
+    MessageType.presentation: Presentation,
+    MessageType.set: SetReq,
+    MessageType.req: SetReq,
+    MessageType.internal: Internal,
+    MessageType.stream: Stream,
+}
+
+
+# Write mySensorsIds.py, the same constants as plain ints:
+#   python3 mySensorsConst.py > mySensorsIds.py
+def writeIds(out):
+    out.write('"""MySensors constants as plain ints, generated from mySensorsConst.py.\n\n'
+              'Do not edit, regenerate with: python3 mySensorsConst.py > mySensorsIds.py\n"""\n')
+    for enum in (MessageType, Presentation, SetReq, Internal, Stream):
+        out.write("\n\nclass %s:\n" % enum.__name__)
+        for name, member in enum.__members__.items():
+            out.write("    %s = %d\n" % (name, member))
+    out.write("\n\n# message type names, indexed by message type\n")
+    out.write("MESSAGE_TYPE_NAMES = (%s)\n" % ", ".join('"%s"' % member.name for member in MessageType))
+    out.write("\n# sub-types (cmdType) of each message type (cmd), without aliases\nSUB_TYPES = {\n")
+    for cmd, subTypes in SUB_TYPES.items():
+        out.write("    %d: (%s),\n" % (cmd, ", ".join(str(int(cmdType)) for cmdType in subTypes)))
+    out.write("}\n")
+    out.write('''
+
+# Build rarely used tables on first access
+def __getattr__(name):
+    if name == "SUB_TYPE_NAMES":
+        # cmd -> {cmdType: name}, built from the enums in mySensorsConst
+        import mySensorsConst
+        table = {int(cmd): {int(cmdType): cmdType.name for cmdType in subTypes}
+                 for cmd, subTypes in mySensorsConst.SUB_TYPES.items()}
+        globals()[name] = table
+        return table
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+''')
+
+if __name__ == "__main__":
+    import sys
+    writeIds(sys.stdout)
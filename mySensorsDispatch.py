@@ -0,0 +1,30 @@
+"""MySensors message dispatcher for version 2.0 of MySensors."""
+import mySensorsIds as const
+
+class MySensorsDispatcher:
+    """Routes messages to handlers through a table keyed by (cmd, cmdType)."""
+
+    def __init__(self,unsupported=None):
+        # handlers are called as handler(mySensorsMsg, Connection)
+        self.handlers = {}
+        self.unsupported = unsupported
+        return
+
+    def register(self,cmd,cmdType,handler):
+        # keys are plain ints so lookup does not go through IntEnum hashing
+        self.handlers[(int(cmd), int(cmdType))] = handler
+
+    def registerAll(self,cmd,handler):
+        # register handler for every sub-type of cmd that has no handler yet
+        for cmdType in const.SUB_TYPES[cmd]:
+            self.handlers.setdefault((int(cmd), int(cmdType)), handler)
+
+    def dispatch(self,mySensorsMsg,Connection):
+        # returns False when no handler was found for the message
+        handler = self.handlers.get((mySensorsMsg.cmd, mySensorsMsg.cmdType))
+        if handler is None:
+            if self.unsupported is not None:
+                self.unsupported(mySensorsMsg,Connection)
+            return False
+        handler(mySensorsMsg,Connection)
+        return True
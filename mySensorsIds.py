@@ -0,0 +1,189 @@
+"""MySensors constants as plain ints, generated from mySensorsConst.py.
+
+Do not edit, regenerate with: python3 mySensorsConst.py > mySensorsIds.py
+"""
+
+
+class MessageType:
+    presentation = 0
+    set = 1
+    req = 2
+    internal = 3
+    stream = 4
+
+
+class Presentation:
+    S_DOOR = 0
+    S_MOTION = 1
+    S_SMOKE = 2
+    S_BINARY = 3
+    S_LIGHT = 3
+    S_DIMMER = 4
+    S_COVER = 5
+    S_TEMP = 6
+    S_HUM = 7
+    S_BARO = 8
+    S_WIND = 9
+    S_RAIN = 10
+    S_UV = 11
+    S_WEIGHT = 12
+    S_POWER = 13
+    S_HEATER = 14
+    S_DISTANCE = 15
+    S_LIGHT_LEVEL = 16
+    S_ARDUINO_NODE = 17
+    S_ARDUINO_REPEATER_NODE = 18
+    S_ARDUINO_RELAY = 18
+    S_LOCK = 19
+    S_IR = 20
+    S_WATER = 21
+    S_AIR_QUALITY = 22
+    S_CUSTOM = 23
+    S_DUST = 24
+    S_SCENE_CONTROLLER = 25
+    S_RGB_LIGHT = 26
+    S_RGBW_LIGHT = 27
+    S_COLOR_SENSOR = 28
+    S_HVAC = 29
+    S_MULTIMETER = 30
+    S_SPRINKLER = 31
+    S_WATER_LEAK = 32
+    S_SOUND = 33
+    S_VIBRATION = 34
+    S_MOISTURE = 35
+    S_INFO = 36
+    S_GAS = 37
+    S_GPS = 38
+    S_WATER_QUALITY = 39
+
+
+class SetReq:
+    V_TEMP = 0
+    V_HUM = 1
+    V_STATUS = 2
+    V_LIGHT = 2
+    V_PERCENTAGE = 3
+    V_DIMMER = 3
+    V_PRESSURE = 4
+    V_FORECAST = 5
+    V_RAIN = 6
+    V_RAINRATE = 7
+    V_WIND = 8
+    V_GUST = 9
+    V_DIRECTION = 10
+    V_UV = 11
+    V_WEIGHT = 12
+    V_DISTANCE = 13
+    V_IMPEDANCE = 14
+    V_ARMED = 15
+    V_TRIPPED = 16
+    V_WATT = 17
+    V_KWH = 18
+    V_SCENE_ON = 19
+    V_SCENE_OFF = 20
+    V_HVAC_FLOW_STATE = 21
+    V_HVAC_SPEED = 22
+    V_LIGHT_LEVEL = 23
+    V_VAR1 = 24
+    V_VAR2 = 25
+    V_VAR3 = 26
+    V_VAR4 = 27
+    V_VAR5 = 28
+    V_UP = 29
+    V_DOWN = 30
+    V_STOP = 31
+    V_IR_SEND = 32
+    V_IR_RECEIVE = 33
+    V_FLOW = 34
+    V_VOLUME = 35
+    V_LOCK_STATUS = 36
+    V_LEVEL = 37
+    V_DUST_LEVEL = 37
+    V_VOLTAGE = 38
+    V_CURRENT = 39
+    V_RGB = 40
+    V_RGBW = 41
+    V_ID = 42
+    V_UNIT_PREFIX = 43
+    V_HVAC_SETPOINT_COOL = 44
+    V_HVAC_SETPOINT_HEAT = 45
+    V_HVAC_FLOW_MODE = 46
+    V_TEXT = 47
+    V_CUSTOM = 48
+    V_POSITION = 49
+    V_IR_RECORD = 50
+    V_PH = 51
+    V_ORP = 52
+    V_EC = 53
+    V_VAR = 54
+    V_VA = 55
+    V_POWER_FACTOR = 56
+
+
+class Internal:
+    I_BATTERY_LEVEL = 0
+    I_TIME = 1
+    I_VERSION = 2
+    I_ID_REQUEST = 3
+    I_ID_RESPONSE = 4
+    I_INCLUSION_MODE = 5
+    I_CONFIG = 6
+    I_FIND_PARENT = 7
+    I_FIND_PARENT_RESPONSE = 8
+    I_LOG_MESSAGE = 9
+    I_CHILDREN = 10
+    I_SKETCH_NAME = 11
+    I_SKETCH_VERSION = 12
+    I_REBOOT = 13
+    I_GATEWAY_READY = 14
+    I_SIGNING_PRESENTATION = 15
+    I_REQUEST_SIGNING = 15
+    I_NONCE_REQUEST = 16
+    I_GET_NONCE = 16
+    I_NONCE_RESPONSE = 17
+    I_GET_NONCE_RESPONSE = 17
+    I_HEARTBEAT = 18
+    I_PRESENTATION = 19
+    I_DISCOVER = 20
+    I_DISCOVER_RESPONSE = 21
+    I_HEARTBEAT_RESPONSE = 22
+    I_LOCKED = 23
+    I_PING = 24
+    I_PONG = 25
+    I_REGISTRATION_REQUEST = 26
+    I_REGISTRATION_RESPONSE = 27
+    I_DEBUG = 28
+
+
+class Stream:
+    ST_FIRMWARE_CONFIG_REQUEST = 0
+    ST_FIRMWARE_CONFIG_RESPONSE = 1
+    ST_FIRMWARE_REQUEST = 2
+    ST_FIRMWARE_RESPONSE = 3
+    ST_SOUND = 4
+    ST_IMAGE = 5
+
+
+# message type names, indexed by message type
+MESSAGE_TYPE_NAMES = ("presentation", "set", "req", "internal", "stream")
+
+# sub-types (cmdType) of each message type (cmd), without aliases
+SUB_TYPES = {
+    0: (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39),
+    1: (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56),
+    2: (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56),
+    3: (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28),
+    4: (0, 1, 2, 3, 4, 5),
+}
+
+
+# Build rarely used tables on first access
+def __getattr__(name):
+    if name == "SUB_TYPE_NAMES":
+        # cmd -> {cmdType: name}, built from the enums in mySensorsConst
+        import mySensorsConst
+        table = {int(cmd): {int(cmdType): cmdType.name for cmdType in subTypes}
+                 for cmd, subTypes in mySensorsConst.SUB_TYPES.items()}
+        globals()[name] = table
+        return table
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -1,15 +1,27 @@
 """MySensors message class for version 2.0 of MySensors."""
+import mySensorsIds as const
+
+# bounds used to reject datagrams before they are decoded
+MIN_MESSAGE_LENGTH = 10         # "0;0;0;0;0;", payload may be empty
+MAX_MESSAGE_LENGTH = 128
+MAX_ID = 255                    # nodeID and child sensor ID
+# valid sub-types (cmdType) for every message type (cmd)
+VALID_SUB_TYPES = {cmd: frozenset(subTypes) for cmd, subTypes in const.SUB_TYPES.items()}
+
 class MySensorsMessage:
-    nodeID = None
-    sensorID = None
-    cmd = None
-    ack = None
-    cmdType = None
-    payload = None
-    
+    # header fields are kept as ints, decoded once when the message is parsed
+    __slots__ = ("nodeID", "sensorID", "cmd", "ack", "cmdType", "payload", "staged")
+
     def __init__(self,strMessage=None):
         try:
-            self.nodeID,self.sensorID,self.cmd,self.ack,self.cmdType,self.payload = strMessage.split(';')
+            nodeID,sensorID,cmd,ack,cmdType,payload = strMessage.split(';',5)
+            self.nodeID = int(nodeID)
+            self.sensorID = int(sensorID)
+            self.cmd = int(cmd)
+            self.ack = int(ack)
+            self.cmdType = int(cmdType)
+            self.payload = payload.rstrip('\r\n')
+            self.staged = None
         except (ValueError, AttributeError):
             # not valid message
             self.nodeID = None
@@ -18,43 +30,90 @@ class MySensorsMessage:
             self.ack = None
             self.cmdType = None
             self.payload = None
+            self.staged = None
         return
-    
+
+    @classmethod
+    def fromBytes(cls,data):
+        # parse received datagram (bytes, bytearray or memoryview) without
+        # decoding the header to str, returns None if data is not valid
+        if not MIN_MESSAGE_LENGTH <= len(data) <= MAX_MESSAGE_LENGTH:
+            return None
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        fields = data.split(b';',5)
+        if len(fields) != 6:
+            return None
+        try:
+            # int() accepts ASCII digits in bytes directly
+            nodeID = int(fields[0])
+            sensorID = int(fields[1])
+            cmd = int(fields[2])
+            ack = int(fields[3])
+            cmdType = int(fields[4])
+        except ValueError:
+            return None
+        # range checks against the protocol constants
+        subTypes = VALID_SUB_TYPES.get(cmd)
+        if (subTypes is None or cmdType not in subTypes or ack > 1 or ack < 0
+                or not 0 <= nodeID <= MAX_ID or not 0 <= sensorID <= MAX_ID):
+            return None
+        msg = cls.__new__(cls)
+        msg.nodeID = nodeID
+        msg.sensorID = sensorID
+        msg.cmd = cmd
+        msg.ack = ack
+        msg.cmdType = cmdType
+        msg.payload = fields[5].rstrip(b'\r\n').decode("utf-8", "ignore")
+        # set values converted ahead, see mySensorsValues.stageSetValue
+        msg.staged = None
+        return msg
+
     def isValid(self):
-        # return true if all values are not None = true
-        return all([self.nodeID,self.sensorID,self.cmd,self.ack,self.cmdType,self.payload])
-    
-    def createMsg(self,nodeID,sensorID,cmd,ack,cmdType,payload):
-        self.nodeID = str(nodeID)
-        self.sensorID = str(sensorID)
-        self.cmd = str(cmd)
-        self.ack = str(ack)
-        self.cmdType = str(cmdType)
-        self.payload = str(payload)
-    
+        # return true if all values are present (0 is a valid value)
+        return (self.nodeID is not None and self.sensorID is not None
+                and self.cmd is not None and self.ack is not None
+                and self.cmdType is not None and self.payload is not None)
+
     def __repr__(self):
-        # string representation used for debugging
+        # string representation used for debugging, only built when debug
+        # logging is on, so the name table is built on first use
         if self.isValid():
             strData  = "MySensors message: \n"
             strData += "nodeID: " + str(self.nodeID) + "\n"
             strData += "child-sensor-id: " + str(self.sensorID) + "\n"
-            strData += "command: " + str(self.cmd) + "\n"
+            strData += "command: " + typeName(const.MESSAGE_TYPE_NAMES, self.cmd) + "\n"
             strData += "Ack?: " + str(self.ack) + "\n"
-            strData += "Type: " + str(self.cmdType) + "\n"
+            strData += "Type: " + typeName(const.SUB_TYPE_NAMES.get(self.cmd, {}), self.cmdType) + "\n"
             strData += "Payload: " + str(self.payload) + "\n"
         else:
             strData  = "Unknown message!"
         return strData
-    
+
     def __str__(self):
         # string representation used for sending messages
         if self.isValid():
-            strData  = str(self.nodeID) + ";"
-            strData += str(self.sensorID) + ";"
-            strData += str(self.cmd) + ";"
-            strData += str(self.ack) + ";"
-            strData += str(self.cmdType) + ";"
-            strData += str(self.payload)
+            strData = "%d;%d;%d;%d;%d;%s" % (self.nodeID, self.sensorID,
+                    self.cmd, self.ack, self.cmdType, self.payload)
         else:
             strData  = ""
-        return strData
\ No newline at end of file
+        return strData
+
+    def toBytes(self):
+        # serialized form used for sending
+        return str(self).encode("utf-8")
+
+# Report 'name (number)' of a message type or sub-type for debug output
+def typeName(names, number):
+    try:
+        return "%s (%d)" % (names[number], number)
+    except (IndexError, KeyError, TypeError):
+        return str(number)
+
+# Parse batch of received datagrams, invalid datagrams are skipped
+def parseMany(datagrams):
+    fromBytes = MySensorsMessage.fromBytes
+    for data in datagrams:
+        msg = fromBytes(data)
+        if msg is not None:
+            yield msg
@@ -0,0 +1,60 @@
+"""Preformatted MySensors responses for version 2.0 of MySensors."""
+import time
+import mySensorsIds as const
+
+# serialized node and child sensor IDs
+ID_BYTES = tuple(str(i).encode("ascii") for i in range(256))
+# child sensor ID used for messages about the node itself
+NODE_SENSOR_ID = 255
+
+INTERNAL = const.MessageType.internal
+
+class ResponseBuilder:
+    """Builds outgoing messages as bytes from precomputed templates.
+
+    For every (cmd, cmdType) the ';cmd;ack;cmdType;' part is serialized once,
+    so a response only splices in the node ID, child sensor ID and payload.
+    """
+
+    def __init__(self,metric=True):
+        self.templates = {}
+        for cmd, subTypes in const.SUB_TYPES.items():
+            for cmdType in subTypes:
+                self.templates[(cmd, cmdType)] = (";%d;0;%d;" % (cmd, cmdType)).encode("ascii")
+        self.setMetric(metric)
+        return
+
+    def setMetric(self,metric):
+        # I_CONFIG answer: (M)etric or (I)mperial
+        self.configPayload = b"M" if metric else b"I"
+
+    def build(self,nodeID,sensorID,cmd,cmdType,payload=b""):
+        if payload.__class__ is not bytes:
+            if payload.__class__ is int and 0 <= payload <= 255:
+                payload = ID_BYTES[payload]
+            else:
+                payload = str(payload).encode("utf-8")
+        return ID_BYTES[nodeID] + b";" + ID_BYTES[sensorID] + self.templates[(cmd, cmdType)] + payload
+
+    def idResponse(self,nodeID):
+        # sent to 0;0 like the nodes of this UDP clone expect
+        return self.build(0, 0, INTERNAL, const.Internal.I_ID_RESPONSE, nodeID)
+
+    def timeResponse(self,nodeID,now=None):
+        # seconds since 1970
+        return self.build(nodeID, NODE_SENSOR_ID, INTERNAL, const.Internal.I_TIME,
+                          int(time.time() if now is None else now))
+
+    def configResponse(self,nodeID):
+        return self.build(nodeID, NODE_SENSOR_ID, INTERNAL, const.Internal.I_CONFIG, self.configPayload)
+
+    def heartbeatResponse(self,nodeID,payload=b"0"):
+        return self.build(nodeID, NODE_SENSOR_ID, INTERNAL, const.Internal.I_HEARTBEAT_RESPONSE, payload)
+
+    def pong(self,nodeID,payload):
+        # payload is the hop counter of the ping
+        return self.build(nodeID, NODE_SENSOR_ID, INTERNAL, const.Internal.I_PONG, payload)
+
+    def discover(self):
+        # broadcast asking all nodes to report their parent
+        return self.build(255, NODE_SENSOR_ID, INTERNAL, const.Internal.I_DISCOVER, b"0")
@@ -0,0 +1,221 @@
+"""Conversion of MySensors set/req values to Domoticz device values."""
+import mySensorsIds as const
+
+#############################################################################
+#               Single value converters: payload -> (nValue, sValue)        #
+#############################################################################
+SWITCH_VALUES = {"0": (0, "Off"), "1": (1, "On")}
+
+def floatValue(payload):
+    # validate only, Domoticz takes the number as it was sent
+    float(payload)
+    return (0, payload)
+
+def switchValue(payload):
+    value = SWITCH_VALUES.get(payload)
+    if value is None:
+        value = (1, "On") if int(payload) else (0, "Off")
+    return value
+
+def levelValue(payload):
+    level = int(float(payload))
+    return (2 if level > 0 else 0, str(level))
+
+def humidityValue(payload):
+    humidity = int(float(payload))
+    return (humidity, humidityStatus(humidity))
+
+def textValue(payload):
+    return (0, payload)
+
+def sceneOnValue(payload):
+    return (1, "On")
+
+def sceneOffValue(payload):
+    return (0, "Off")
+
+# Domoticz humidity status: 0=normal, 1=comfortable, 2=dry, 3=wet
+def humidityStatus(humidity):
+    if humidity < 30:
+        return "2"
+    if humidity > 70:
+        return "3"
+    if 40 <= humidity <= 60:
+        return "1"
+    return "0"
+
+FLOAT_TYPES = (
+    const.SetReq.V_TEMP, const.SetReq.V_PRESSURE, const.SetReq.V_RAIN,
+    const.SetReq.V_RAINRATE, const.SetReq.V_WIND, const.SetReq.V_GUST,
+    const.SetReq.V_DIRECTION, const.SetReq.V_UV, const.SetReq.V_WEIGHT,
+    const.SetReq.V_DISTANCE, const.SetReq.V_IMPEDANCE, const.SetReq.V_WATT,
+    const.SetReq.V_KWH, const.SetReq.V_LIGHT_LEVEL, const.SetReq.V_FLOW,
+    const.SetReq.V_VOLUME, const.SetReq.V_LEVEL, const.SetReq.V_VOLTAGE,
+    const.SetReq.V_CURRENT, const.SetReq.V_HVAC_SETPOINT_COOL,
+    const.SetReq.V_HVAC_SETPOINT_HEAT, const.SetReq.V_PH, const.SetReq.V_ORP,
+    const.SetReq.V_EC, const.SetReq.V_VAR, const.SetReq.V_VA,
+    const.SetReq.V_POWER_FACTOR,
+)
+
+SWITCH_TYPES = (
+    const.SetReq.V_STATUS, const.SetReq.V_ARMED, const.SetReq.V_TRIPPED,
+    const.SetReq.V_LOCK_STATUS,
+)
+
+# converter for every SetReq type, all other types are passed on as text
+SET_CONVERTERS = {vType: textValue for vType in const.SUB_TYPES[const.MessageType.set]}
+SET_CONVERTERS.update({int(vType): floatValue for vType in FLOAT_TYPES})
+SET_CONVERTERS.update({int(vType): switchValue for vType in SWITCH_TYPES})
+SET_CONVERTERS[const.SetReq.V_PERCENTAGE] = levelValue
+SET_CONVERTERS[const.SetReq.V_HUM] = humidityValue
+SET_CONVERTERS[const.SetReq.V_SCENE_ON] = sceneOnValue
+SET_CONVERTERS[const.SetReq.V_SCENE_OFF] = sceneOffValue
+
+#############################################################################
+#      Composite devices: several V_* values in one ';' separated sValue    #
+#############################################################################
+# field converters report the sValue fields from index on for payload
+def floatField(payload):
+    float(payload)
+    return (payload,)
+
+def scaledField(scale):
+    def field(payload):
+        return (str(round(float(payload) * scale, 2)),)
+    field.toPayload = lambda value: str(round(float(value) / scale, 3))
+    return field
+
+def humidityField(payload):
+    humidity = int(float(payload))
+    return (str(humidity), humidityStatus(humidity))
+
+COMPASS = ("N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+           "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW")
+
+def directionField(payload):
+    direction = float(payload)
+    return (payload, COMPASS[int((direction % 360) / 22.5 + 0.5) % 16])
+
+# MySensors forecast strings to Domoticz forecast codes
+BARO_FORECASTS = {"stable": "0", "sunny": "1", "cloudy": "2", "unstable": "3",
+                  "thunderstorm": "4", "unknown": "5"}
+THB_FORECASTS = {"stable": "2", "sunny": "1", "cloudy": "3", "unstable": "4",
+                 "thunderstorm": "4", "unknown": "0"}
+
+def forecastField(forecasts):
+    def field(payload):
+        return (forecasts.get(payload, forecasts["unknown"]),)
+    names = {code: name for name, code in forecasts.items()}
+    field.toPayload = lambda value: names.get(value, "unknown")
+    return field
+
+class Layout:
+    """sValue layout of a composite Domoticz device type."""
+    __slots__ = ("defaults", "fields")
+
+    def __init__(self,defaults,fields):
+        self.defaults = defaults    # initial sValue fields
+        # V_* type -> (index, field converter)
+        self.fields = {int(vType): field for vType, field in fields.items()}
+
+    def initialFields(self,sValue):
+        # start from current device value when it matches the layout
+        fields = sValue.split(';') if sValue else []
+        if len(fields) != len(self.defaults):
+            fields = list(self.defaults)
+        return fields
+
+LAYOUTS = {
+    "Temp+Hum": Layout(("0", "0", "0"), {
+        const.SetReq.V_TEMP: (0, floatField),
+        const.SetReq.V_HUM: (1, humidityField)}),
+    "Temp+Hum+Baro": Layout(("0", "0", "0", "1013", "0"), {
+        const.SetReq.V_TEMP: (0, floatField),
+        const.SetReq.V_HUM: (1, humidityField),
+        const.SetReq.V_PRESSURE: (3, floatField),
+        const.SetReq.V_FORECAST: (4, forecastField(THB_FORECASTS))}),
+    "Barometer": Layout(("1013", "5"), {
+        const.SetReq.V_PRESSURE: (0, floatField),
+        const.SetReq.V_FORECAST: (1, forecastField(BARO_FORECASTS))}),
+    "kWh": Layout(("0", "0"), {
+        const.SetReq.V_WATT: (0, floatField),
+        const.SetReq.V_KWH: (1, scaledField(1000))}),
+    "Rain": Layout(("0", "0"), {
+        const.SetReq.V_RAINRATE: (0, scaledField(100)),
+        const.SetReq.V_RAIN: (1, floatField)}),
+    "Wind": Layout(("0", "N", "0", "0", "0", "0"), {
+        const.SetReq.V_DIRECTION: (0, directionField),
+        const.SetReq.V_WIND: (2, scaledField(10)),
+        const.SetReq.V_GUST: (3, scaledField(10)),
+        const.SetReq.V_TEMP: (4, floatField)}),
+    "UV": Layout(("0", "0"), {
+        const.SetReq.V_UV: (0, floatField)}),
+}
+
+#############################################################################
+#        Staged conversion: done ahead of knowing the target device         #
+#############################################################################
+# every converter a set payload of a value type can go through
+def stagedConverters():
+    converters = {vType: [converter] for vType, converter in SET_CONVERTERS.items()}
+    for layout in LAYOUTS.values():
+        for vType, (index, converter) in layout.fields.items():
+            if converter not in converters[vType]:
+                converters[vType].append(converter)
+    return {vType: tuple(found) for vType, found in converters.items()}
+
+STAGED_CONVERTERS = stagedConverters()
+
+# Convert payload with every converter of valueType, report
+# {converter: result}, result is the ValueError when payload is not valid
+def stageSetValue(valueType, payload):
+    staged = {}
+    for converter in STAGED_CONVERTERS.get(valueType, (textValue,)):
+        try:
+            staged[converter] = converter(payload)
+        except ValueError as inst:
+            staged[converter] = inst
+    return staged
+
+# Report converter(payload), taken from staged when it was converted ahead
+def converted(converter, payload, staged=None):
+    if staged is not None:
+        result = staged.get(converter)
+        if result is not None:
+            if isinstance(result, ValueError):
+                raise result
+            return result
+    return converter(payload)
+
+# Domoticz (Type, SubType) of existing composite devices, SubType None = any
+DEVICE_TYPE_NAMES = {
+    (82, None): "Temp+Hum",
+    (84, None): "Temp+Hum+Baro",
+    (85, None): "Rain",
+    (86, None): "Wind",
+    (87, None): "UV",
+    (243, 26): "Barometer",
+    (243, 29): "kWh",
+}
+
+# Report req payload of valueType from a device value, None if not known
+def reqPayload(valueType, nValue, sValue, layout=None):
+    if layout is not None:
+        field = layout.fields.get(valueType)
+        if field is None:
+            return None
+        index, converter = field
+        fields = sValue.split(';')
+        if index >= len(fields):
+            return None
+        return getattr(converter, "toPayload", str)(fields[index])
+    if valueType in SWITCH_TYPES or valueType in (const.SetReq.V_SCENE_ON, const.SetReq.V_SCENE_OFF):
+        return "1" if nValue else "0"
+    if valueType == const.SetReq.V_HUM:
+        return str(nValue)
+    return sValue
+
+# Report layout of existing Domoticz device, None for single value devices
+def layoutForDevice(Type, SubType):
+    typeName = DEVICE_TYPE_NAMES.get((Type, SubType)) or DEVICE_TYPE_NAMES.get((Type, None))
+    return LAYOUTS.get(typeName)
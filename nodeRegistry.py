@@ -0,0 +1,129 @@
+"""Persistent registry of MySensors node metadata."""
+import json
+import os
+import time
+
+class NodeInfo:
+    """Metadata remembered for one node."""
+    __slots__ = ("nodeID", "uniqueID", "sketchName", "sketchVersion",
+                 "libraryVersion", "parent", "address", "lastSeen", "units", "sensors")
+
+    def __init__(self,nodeID):
+        self.nodeID = nodeID
+        self.uniqueID = None
+        self.sketchName = None
+        self.sketchVersion = None
+        self.libraryVersion = None
+        self.parent = None      # parent nodeID from I_DISCOVER_RESPONSE
+        self.address = None     # source address of last message
+        self.lastSeen = 0
+        self.units = None       # sensorID -> Domoticz unit, see UnitAllocator
+        self.sensors = None     # sensorID -> presentation type of combined sensors
+
+    def toDict(self):
+        return {name: getattr(self, name) for name in self.__slots__
+                if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return "Node " + json.dumps(self.toDict())
+
+class NodeRegistry:
+    """Node metadata kept in an append-only file of JSON records.
+
+    Each changed node is appended as one line and later lines override
+    earlier ones. The file is read on first access rather than in onStart,
+    and rewritten with one line per node once it holds more than twice as
+    many records as there are nodes.
+    """
+
+    # lastSeen alone is written out at most this often (seconds)
+    LAST_SEEN_RESOLUTION = 300
+
+    def __init__(self,fileName):
+        self.fileName = fileName
+        self._nodes = None
+        self.dirty = set()
+        self.records = 0        # records in the file
+        self.savedSeen = {}     # nodeID -> lastSeen last written to file
+        return
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self.load()
+        return self._nodes
+
+    def load(self):
+        self._nodes = {}
+        self.records = 0
+        try:
+            with open(self.fileName, "r") as registryFile:
+                for line in registryFile:
+                    try:
+                        record = json.loads(line)
+                        node = self._nodes.get(record["nodeID"])
+                        if node is None:
+                            node = self._nodes[record["nodeID"]] = NodeInfo(record["nodeID"])
+                    except (ValueError, KeyError, TypeError):
+                        # incomplete last line after a crash
+                        continue
+                    for name, value in record.items():
+                        if name in NodeInfo.__slots__:
+                            setattr(node, name, value)
+                    self.savedSeen[node.nodeID] = node.lastSeen
+                    self.records += 1
+        except FileNotFoundError:
+            pass
+
+    def get(self,nodeID):
+        return self.nodes.get(nodeID)
+
+    def update(self,nodeID,**fields):
+        # set metadata fields, node is written on next save when changed
+        node = self.nodes.get(nodeID)
+        if node is None:
+            node = self.nodes[nodeID] = NodeInfo(nodeID)
+            self.dirty.add(nodeID)
+        for name, value in fields.items():
+            if getattr(node, name) != value:
+                setattr(node, name, value)
+                self.dirty.add(nodeID)
+        return node
+
+    def seen(self,nodeID,address,now=None):
+        if now is None:
+            now = time.time()
+        node = self.nodes.get(nodeID)
+        if node is None:
+            node = self.update(nodeID)
+        node.lastSeen = now
+        if node.address != address:
+            node.address = address
+            self.dirty.add(nodeID)
+        elif now - self.savedSeen.get(nodeID, 0) >= self.LAST_SEEN_RESOLUTION:
+            self.dirty.add(nodeID)
+
+    def save(self):
+        if not self.dirty:
+            return
+        if self.records + len(self.dirty) > 2 * len(self.nodes):
+            self.compact()
+            return
+        with open(self.fileName, "a") as registryFile:
+            for nodeID in self.dirty:
+                node = self.nodes[nodeID]
+                registryFile.write(json.dumps(node.toDict()) + "\n")
+                self.savedSeen[nodeID] = node.lastSeen
+        self.records += len(self.dirty)
+        self.dirty.clear()
+
+    def compact(self):
+        # rewrite file with the latest record of every node
+        tempName = self.fileName + ".tmp"
+        with open(tempName, "w") as registryFile:
+            for nodeID, node in self.nodes.items():
+                registryFile.write(json.dumps(node.toDict()) + "\n")
+                self.savedSeen[nodeID] = node.lastSeen
+        os.replace(tempName, self.fileName)
+        self.records = len(self.nodes)
+        self.dirty.clear()
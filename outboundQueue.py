@@ -0,0 +1,54 @@
+"""Paced outbound queue for messages sent over UDP."""
+import time
+from collections import OrderedDict
+from tokenBucket import TokenBucket
+
+class OutboundQueue:
+    """Sends already serialized messages at most rate per second.
+
+    Messages are sent right away while the token bucket allows it, otherwise
+    they wait in a FIFO queue that flush() drains. Identical messages to the
+    same destination that are still pending are sent only once, and new
+    messages are dropped when maxDepth messages are pending.
+    """
+
+    def __init__(self,rate=20,burst=10,maxDepth=500):
+        self.bucket = TokenBucket(rate, burst)
+        self.maxDepth = maxDepth
+        self.pending = OrderedDict()    # (address, port, data) -> Connection
+        # counters
+        self.sent = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.highWater = 0
+        return
+
+    def __len__(self):
+        return len(self.pending)
+
+    def send(self,Connection,data,now=None):
+        if now is None:
+            now = time.monotonic()
+        key = (Connection.Address, Connection.Port, data)
+        if key in self.pending:
+            self.duplicates += 1
+            return
+        if not self.pending and self.bucket.consume(now):
+            Connection.Send(data)
+            self.sent += 1
+            return
+        if len(self.pending) >= self.maxDepth:
+            self.dropped += 1
+            return
+        self.pending[key] = Connection
+        if len(self.pending) > self.highWater:
+            self.highWater = len(self.pending)
+
+    def flush(self,now=None):
+        if now is None:
+            now = time.monotonic()
+        pending = self.pending
+        while pending and self.bucket.consume(now):
+            (address, port, data), Connection = pending.popitem(last=False)
+            Connection.Send(data)
+            self.sent += 1
@@ -6,6 +6,8 @@
 # Useful IP Address and Port combinations that can be set via the Hardware page:
 #    239.255.250.250:9161 - Dynamic Device Discovery (DDD) (default, shows Global Cache, Denon Amps and more)
 #    239.255.255.250:1900 - Simple Service Discovery Protocol (SSDP), (shows Windows, Kodi, Denon, Chromebooks, Gateways, ...)
+#    255.255.255.255:9009 - MySensors clone over UDP
+# "All" listens on all three at once, each datagram goes to the parser of the listener it arrived on.
 # Author: Dnpwwo, 2017
 #
 """
@@ -16,6 +18,7 @@
                 <option label="Dynamic Device Discovery" value="239.255.250.250:9161"/>
                 <option label="Simple Service Discovery Protocol" value="239.255.255.250:1900" />
                 <option label="MySensors clone over UDP" value="255.255.255.255:9009"  default="true" />
+                <option label="All" value="All" />
             </options>
         </param>
         <param field="Mode2" label="Create Devices" width="75px">
@@ -24,20 +27,64 @@
                 <option label="False" value="False"  default="true" />
             </options>
         </param>
+        <param field="Mode3" label="Device update interval (s)" width="75px" default="10"/>
+        <param field="Mode4" label="Options" width="300px" default="sendRate=20;sendBurst=10"/>
+        <param field="Mode6" label="Log level" width="150px">
+            <options>
+                <option label="Debug" value="Debug"/>
+                <option label="Normal" value="Normal" default="true" />
+                <option label="Errors only" value="Errors"/>
+            </options>
+        </param>
     </params>
 </plugin>
 """
 import Domoticz
-import mySensorsConst as const
+import os
+import struct
+import time
+import mySensorsIds as const
 from mySensorsMessage import MySensorsMessage
+from mySensorsDispatch import MySensorsDispatcher
+from deviceIndex import DeviceIndex
+from deviceUpdateCache import DeviceUpdateCache
+from outboundQueue import OutboundQueue
+from nodeRegistry import NodeRegistry
+from discoveryMessage import SsdpMessage, DddBeacon
+from hostCache import HostCache
+from sourceRateLimiter import SourceRateLimiter
+from dedupCache import DedupCache
+from pluginStats import PluginStats, formatReport
+from decodePipeline import DecodePipeline
+from firmwareCache import FirmwareCache, hexToWords
+from mySensorsResponse import ResponseBuilder
+from unitAllocator import UnitAllocator, parseShard
+import pluginLog
+import mySensorsValues as values
 
 class BasePlugin:
-    BeaconConn = None
+    dispatcher = None
+    pipeline = None
 
     def __init__(self):
+        self.listeners = {}
+        # parser and handler used for datagrams received on each listener
+        self.decoders = {
+            "MySensors": MySensorsMessage.fromBytes,
+            "SSDP": SsdpMessage.fromBytes,
+            "DDD": DddBeacon.fromBytes,
+        }
+        self.messageHandlers = {
+            "MySensors": self.onMySensorsMessage,
+            "SSDP": self.onSsdpMessage,
+            "DDD": self.onDddMessage,
+        }
         return
 
     def onStart(self):
+        log.setLevel(LOG_LEVELS.get(Parameters.get("Mode6"), pluginLog.INFO))
+        options.update(parseOptions(Parameters.get("Mode4", "")))
+
         # Test by creating few different devices
         #Domoticz.Device("Device a",5,"Temp+Hum",DeviceID="00:0a:95:9d:68:16").Create()
         #Domoticz.Device("Device b",4,"Barometer",DeviceID="00:0a:95:9d:68:16").Create()
@@ -45,45 +92,275 @@ class BasePlugin:
         #Domoticz.Device("Device d",42,"Text",DeviceID="00:0a:95:9d:68:18").Create()
         #Domoticz.Device("Device e",7,"Text",DeviceID="00:0a:95:9d:68:25").Create()
         
+        # index of existing devices, kept up to date by CreateDevice
+        deviceIndex.build(Devices)
+        for x in Devices:
+            layout = values.layoutForDevice(Devices[x].Type, Devices[x].SubType)
+            if layout is not None:
+                deviceLayouts[x] = layout
+
         DumpConfigToLog()
 
-        sAddress, sep, sPort = Parameters["Mode1"].partition(':')
-        self.BeaconConn = Domoticz.Connection(Name="Beacon",
-                Transport="UDP/IP", Address=sAddress, Port=str(sPort))
-        self.BeaconConn.Listen()
+        # device updates are coalesced and written every update interval
+        global updateCache
+        try:
+            interval = int(Parameters["Mode3"])
+        except (KeyError, ValueError):
+            interval = 10
+        updateCache = DeviceUpdateCache(writeDevice, interval, MIN_UPDATE_PERIODS, IMMEDIATE_UPDATE_TYPES)
+        self.heartbeatInterval = max(1, min(interval, 30))
+        self.nextHeartbeat = 0
+        Domoticz.Heartbeat(self.heartbeatInterval)
+
+        # node metadata is read from disk on first use, not here
+        global nodeRegistry
+        nodeRegistry = NodeRegistry(os.path.join(Parameters["HomeFolder"],
+                "nodes_" + str(Parameters.get("HardwareID", 0)) + ".json"))
+
+        # this instance serves the nodeID range of its shard (option shard=i/n)
+        global unitAllocator
+        try:
+            shard, shards = parseShard(getOption("shard", "0/1"))
+        except ValueError:
+            log.error("Invalid shard option '%s', using 0/1", getOption("shard", ""))
+            shard, shards = 0, 1
+        unitAllocator = UnitAllocator(nodeRegistry, shard, shards)
+        if shards > 1:
+            log.info("Shard %d of %d, nodeIDs %d-%d", shard, shards, unitAllocator.firstNode, unitAllocator.lastNode)
+
+        # OTA firmware images from HomeFolder/firmware/<type>/<version>.hex
+        global firmwareCache
+        firmwareCache = FirmwareCache(os.path.join(Parameters["HomeFolder"], "firmware"))
+
+        # discovered SSDP/DDD hosts, only new or changed hosts touch devices
+        global hostCache
+        hostCache = HostCache(getOption("hostCacheSize", 512, int))
+
+        # one misbehaving source must not starve the plugin thread
+        global rateLimiter
+        rateLimiter = SourceRateLimiter(getOption("rateLimit", 50.0, float), getOption("rateBurst", 100, int))
+
+        # repeated copies of a datagram (retransmits, broadcast echoes) are dropped
+        global dedupCache
+        dedupCache = DedupCache(getOption("dedupWindow", 1.0, float))
+
+        # load statistics, published every statsInterval seconds
+        global stats
+        stats = PluginStats()
+        self.statsInterval = getOption("statsInterval", 300, int)
+        self.nextStats = time.monotonic() + self.statsInterval
+
+        # responses are paced so a boot storm does not flood the network
+        global outboundQueue
+        outboundQueue = OutboundQueue(getOption("sendRate", 20.0, float), getOption("sendBurst", 10, int))
+
+        # responses are spliced into preformatted templates
+        global responses
+        responses = ResponseBuilder(getOption("units", "M") != "I")
+
+        # routing table is built once, onMessage only does a dict lookup
+        self.dispatcher = createDispatcher()
+
+        # optional pipeline mode: datagrams are decoded and set values
+        # converted on worker threads, drained on every short heartbeat
+        workers = getOption("pipeline", 0, int)
+        if workers > 0:
+            decoders = dict(self.decoders, MySensors=decodeAndStage)
+            self.pipeline = DecodePipeline(decoders, decodeAndStage, workers,
+                    getOption("pipelineSize", 4096, int), getOption("pipelinePolicy", "dropOldest") != "dropNewest")
+            self.pipeline.start()
+            Domoticz.Heartbeat(PIPELINE_HEARTBEAT)
+            log.info("Pipeline mode with %d decode worker(s)", workers)
+
+        for name, sAddress, sPort in getListeners(Parameters["Mode1"]):
+            self.listeners[name] = Domoticz.Connection(Name=name,
+                    Transport="UDP/IP", Address=sAddress, Port=str(sPort))
+            self.listeners[name].Listen()
+
+        # ask nodes to report their parent
+        if "MySensors" in self.listeners:
+            sendUDPData(self.listeners["MySensors"], responses.discover())
 
     def onMessage(self, Connection, Data):
         try:
-            strMessage = Data.decode("utf-8", "ignore")
-            Domoticz.Log("onMessage called from: "+Connection.Address+":"+Connection.Port+" with data: "+strMessage)
-            
-            # decode MySensors message
-            mySensorsMsg = MySensorsMessage(strMessage)
-            Domoticz.Log(repr(mySensorsMsg))
-            
-            # process supported messages
-            if mySensorsMsg.isValid():
-                if(int(mySensorsMsg.cmd) == const.MessageType.internal):
-                    processInternalMsg(mySensorsMsg,Connection)
-                elif (int(mySensorsMsg.cmd) == const.MessageType.presentation):
-                    processPresentationMsg(mySensorsMsg,Connection)
-                elif (int(mySensorsMsg.cmd) == const.MessageType.set):
-                    processSetMsg(mySensorsMsg,Connection)
-                else:
-                    if mySensorsMsg.isValid():
-                        Domoticz.Log("Unsupported message!")
-                    else:
-                        Domoticz.Log("Not valid MySensors message!")
+            now = time.monotonic()
+            # a flooding source is cut off before anything else is done for it
+            if rateLimiter.rate and not rateLimiter.allow(Connection.Address, now):
+                return
+            if dedupCache.window > 0 and dedupCache.seen(Connection.Address, Data, now):
+                if processDuplicate(Connection, Data):
+                    return
+            log.debug("onMessage called from: %s:%s with data: %r", Connection.Address, Connection.Port, Data)
+            if self.pipeline is not None:
+                # handle what workers finished so far, never wait for them
+                self.pipeline.submit(Connection, Data)
+                self.processDecoded(PIPELINE_BATCH)
+            else:
+                decoded = self.decoders.get(Connection.Name, MySensorsMessage.fromBytes)(Data)
+                self.messageHandlers.get(Connection.Name, self.onMySensorsMessage)(Connection, decoded)
+
+            if updateCache.isDue(now):
+                updateCache.flush(now)
+            if outboundQueue.pending:
+                outboundQueue.flush(now)
                     
             # debug what we did to devices
             #DumpConfigToLog()
         except Exception as inst:
-            Domoticz.Error("Exception in onMessage, called with Data: '"+str(strMessage)+"'")
-            Domoticz.Error("Exception detail: '"+str(inst)+"'")
+            log.error("Exception in onMessage, called with Data: '%s'", Data)
+            log.error("Exception detail: '%s'", inst)
             raise
 
+    def processDecoded(self, limit=None):
+        # handle datagrams decoded by the pipeline workers
+        messageHandlers = self.messageHandlers
+        for Connection, decoded in self.pipeline.drain(limit):
+            messageHandlers.get(Connection.Name, self.onMySensorsMessage)(Connection, decoded)
+
+    def onMySensorsMessage(self, Connection, mySensorsMsg):
+        # process supported messages
+        if mySensorsMsg is not None:
+            log.debug("%r", mySensorsMsg)
+            if mySensorsMsg.nodeID != NODE_ID_UNASSIGNED:
+                if not unitAllocator.owns(mySensorsMsg.nodeID):
+                    # node of another shard
+                    return
+                nodeRegistry.seen(mySensorsMsg.nodeID, Connection.Address)
+            elif mySensorsMsg.cmd != const.MessageType.internal:
+                return
+            if mySensorsMsg.ack:
+                # echo the message back as its ack, copies get the same bytes
+                ack = mySensorsMsg.toBytes()
+                sendUDPData(Connection, ack)
+                if dedupCache.window > 0:
+                    dedupCache.acked(Connection.Address, ack)
+            stats.packets[mySensorsMsg.cmd] += 1
+            start = time.perf_counter_ns()
+            self.dispatcher.dispatch(mySensorsMsg,Connection)
+            stats.dispatched(time.perf_counter_ns() - start)
+        else:
+            stats.parseFailures += 1
+            log.debug("Not valid MySensors message!")
+
+    def onSsdpMessage(self, Connection, ssdpMsg):
+        if ssdpMsg is None:
+            stats.parseFailures += 1
+            log.debug("Not valid SSDP message!")
+            return
+        stats.packets[-1] += 1
+        if not ssdpMsg.announcement:
+            log.debug("SSDP %s from %s ignored", ssdpMsg.method, Connection.Address)
+            return
+        usn = ssdpMsg.usn
+        log.debug("SSDP %s from %s, USN: %s", ssdpMsg.method, Connection.Address, usn)
+        if usn is None:
+            return
+        if not ssdpMsg.alive:
+            hostCache.remove(Connection.Address, usn)
+            return
+        info = usn + " " + ssdpMsg.location if ssdpMsg.location else usn
+        if hostCache.announce(Connection.Address, usn, info, ssdpMsg.maxAge):
+            processDiscoveredHost(Connection.Address, info)
+
+    def onDddMessage(self, Connection, beacon):
+        if beacon is None:
+            stats.parseFailures += 1
+            log.debug("Not valid DDD beacon!")
+            return
+        stats.packets[-1] += 1
+        uuid = beacon.uuid
+        log.debug("DDD beacon from %s, UUID: %s", Connection.Address, uuid)
+        info = beacon.data.decode("utf-8", "ignore").strip()
+        if hostCache.announce(Connection.Address, uuid, info, DDD_BEACON_TTL):
+            processDiscoveredHost(Connection.Address, info)
+
+    def onHeartbeat(self):
+        now = time.monotonic()
+        if self.pipeline is not None:
+            self.processDecoded()
+            # heartbeat is short in pipeline mode, the rest runs every interval
+            if now < self.nextHeartbeat:
+                if outboundQueue.pending:
+                    outboundQueue.flush(now)
+                return
+            self.nextHeartbeat = now + self.heartbeatInterval
+        for address, dropped in rateLimiter.takeLimited().items():
+            log.error("Rate limit exceeded by %s, %d datagrams dropped", address, dropped)
+        hostCache.expire()
+        updateCache.flush()
+        outboundQueue.flush()
+        nodeRegistry.save()
+        stats.queueDepths.add(len(outboundQueue))
+        if self.statsInterval > 0 and now >= self.nextStats:
+            self.nextStats = now + self.statsInterval
+            publishStats(stats.report(now))
+
+    def onStop(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.processDecoded()
+            log.info("Pipeline datagrams: %d, dropped: %d, decode errors: %d",
+                     self.pipeline.submitted, self.pipeline.dropped, self.pipeline.errors)
+
+        # write out everything still pending
+        updateCache.flush(force=True)
+        nodeRegistry.save()
+        log.info("Datagrams rate limited: %d, duplicates: %d, rejected as not valid: %d",
+                 rateLimiter.dropped, dedupCache.duplicates, stats.parseFailures)
+        log.info("Device updates written: %d, suppressed: %d", updateCache.flushed, updateCache.suppressed)
+        log.info("Messages sent: %d, duplicates: %d, dropped: %d, queued: %d, max queue depth: %d",
+                 outboundQueue.sent, outboundQueue.duplicates, outboundQueue.dropped,
+                 len(outboundQueue), outboundQueue.highWater)
+
+    def onDeviceRemoved(self, Unit):
+        deviceIndex.deviceRemoved(Unit)
+        unitAllocator.release(Unit)
+        updateCache.pending.pop(Unit, None)
+        deviceLayouts.pop(Unit, None)
+        compositeFields.pop(Unit, None)
+        combinedRoutes.clear()
+
+# Listeners opened for the 'All' discovery type: (name, address, port)
+LISTENERS = (
+    ("DDD", "239.255.250.250", "9161"),
+    ("SSDP", "239.255.255.250", "1900"),
+    ("MySensors", "255.255.255.255", "9009"),
+)
+
+# Decoded datagrams handled per onMessage call in pipeline mode
+PIPELINE_BATCH = 256
+# Heartbeat (seconds) in pipeline mode. onMessage only hands over what the
+# workers finished, so a lone datagram is handled within this time.
+PIPELINE_HEARTBEAT = 1
+
+# DDD beacons carry no max-age, hosts are forgotten after missing a few
+DDD_BEACON_TTL = 180
+
+# Log levels selectable on the hardware page
+LOG_LEVELS = {
+    "Debug": pluginLog.DEBUG,
+    "Normal": pluginLog.INFO,
+    "Errors": pluginLog.ERROR,
+}
+
 global _plugin
 _plugin = BasePlugin()
+log = pluginLog.PluginLogger(Domoticz.Log, Domoticz.Error)
+deviceIndex = DeviceIndex()
+updateCache = None
+outboundQueue = None
+nodeRegistry = None
+unitAllocator = None
+hostCache = None
+rateLimiter = None
+dedupCache = None
+stats = None
+firmwareCache = None
+responses = None
+options = {}            # key=value options from the Options (Mode4) field
+deviceLayouts = {}      # unit -> sValue layout of composite devices
+compositeFields = {}    # unit -> latest sValue fields of composite devices
+combinedRoutes = {}     # nodeID -> {sensorID: (combined unit, value types)}
 
 def onStart():
     global _plugin
@@ -93,126 +370,566 @@ def onMessage(Connection, Data):
     global _plugin
     _plugin.onMessage(Connection, Data)
 
+def onHeartbeat():
+    global _plugin
+    _plugin.onHeartbeat()
+
+def onStop():
+    global _plugin
+    _plugin.onStop()
+
+def onDeviceRemoved(Unit):
+    global _plugin
+    _plugin.onDeviceRemoved(Unit)
+
 #############################################################################
 #                MySensors message processing functions                     #
 #############################################################################
+# nodeID used by nodes that did not get an ID yet
+NODE_ID_UNASSIGNED = 255
+
+# cmd field of stream messages in a datagram
+STREAM_CMD = str(const.MessageType.stream).encode("ascii")
+
+# Domoticz device (name, type name) created for each presented sensor type
+PRESENTATION_DEVICES = {
+    const.Presentation.S_DOOR: ("Door", "Contact"),
+    const.Presentation.S_MOTION: ("Motion", "Motion"),
+    const.Presentation.S_SMOKE: ("Smoke", "Switch"),
+    const.Presentation.S_LIGHT: ("Light", "Switch"),
+    const.Presentation.S_DIMMER: ("Dimmer", "Dimmer"),
+    const.Presentation.S_COVER: ("Cover", "Switch"),
+    const.Presentation.S_TEMP: ("Temperature", "Temperature"),
+    const.Presentation.S_HUM: ("Humidity", "Humidity"),
+    const.Presentation.S_BARO: ("Barometer", "Barometer"),
+    const.Presentation.S_WIND: ("Wind", "Wind"),
+    const.Presentation.S_RAIN: ("Rain", "Rain"),
+    const.Presentation.S_UV: ("UV", "UV"),
+    const.Presentation.S_WEIGHT: ("Weight", "Custom"),
+    const.Presentation.S_POWER: ("Power", "kWh"),
+    const.Presentation.S_HEATER: ("Heater", "Switch"),
+    const.Presentation.S_DISTANCE: ("Distance", "Distance"),
+    const.Presentation.S_LIGHT_LEVEL: ("Light level", "Illumination"),
+    const.Presentation.S_LOCK: ("Lock", "Switch"),
+    const.Presentation.S_IR: ("IR", "Text"),
+    const.Presentation.S_WATER: ("Water", "Waterflow"),
+    const.Presentation.S_AIR_QUALITY: ("Air quality", "Air Quality"),
+    const.Presentation.S_CUSTOM: ("Custom", "Custom"),
+    const.Presentation.S_DUST: ("Dust", "Custom"),
+    const.Presentation.S_SCENE_CONTROLLER: ("Scene controller", "Push On"),
+    const.Presentation.S_RGB_LIGHT: ("RGB light", "Dimmer"),
+    const.Presentation.S_RGBW_LIGHT: ("RGBW light", "Dimmer"),
+    const.Presentation.S_COLOR_SENSOR: ("Color sensor", "Text"),
+    const.Presentation.S_HVAC: ("HVAC", "Temperature"),
+    const.Presentation.S_MULTIMETER: ("Multimeter", "Voltage"),
+    const.Presentation.S_SPRINKLER: ("Sprinkler", "Switch"),
+    const.Presentation.S_WATER_LEAK: ("Water leak", "Switch"),
+    const.Presentation.S_SOUND: ("Sound", "Sound Level"),
+    const.Presentation.S_VIBRATION: ("Vibration", "Custom"),
+    const.Presentation.S_MOISTURE: ("Moisture", "Soil Moisture"),
+    const.Presentation.S_INFO: ("Info", "Text"),
+    const.Presentation.S_GAS: ("Gas", "Gas"),
+    const.Presentation.S_GPS: ("GPS", "Text"),
+    const.Presentation.S_WATER_QUALITY: ("Water quality", "Custom"),
+}
+
+# Sensor types combined into one Temp+Hum(+Baro) device per node and the
+# value types each of them adds to it
+COMBINED_SENSOR_TYPES = {
+    const.Presentation.S_TEMP: (const.SetReq.V_TEMP,),
+    const.Presentation.S_HUM: (const.SetReq.V_HUM,),
+    const.Presentation.S_BARO: (const.SetReq.V_PRESSURE, const.SetReq.V_FORECAST),
+}
+COMBINED_VALUE_TYPES = frozenset(valueType for valueTypes in COMBINED_SENSOR_TYPES.values()
+                                 for valueType in valueTypes)
+# child sensorID the combined device is allocated for, 255 is the node itself
+COMBINED_SENSOR_ID = 255
+
+# Build routing table for all MySensors message types
+def createDispatcher():
+    dispatcher = MySensorsDispatcher()
+    dispatcher.register(const.MessageType.internal, const.Internal.I_ID_REQUEST, processIdRequestMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_SKETCH_NAME, processSketchNameMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_SKETCH_VERSION, processSketchVersionMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_HEARTBEAT, processHeartbeatMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_HEARTBEAT_RESPONSE, processHeartbeatResponseMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_TIME, processTimeMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_CONFIG, processConfigMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_PING, processPingMsg)
+    dispatcher.register(const.MessageType.internal, const.Internal.I_DISCOVER_RESPONSE, processDiscoverResponseMsg)
+    dispatcher.registerAll(const.MessageType.internal, processInternalMsg)
+    for sensorType in PRESENTATION_DEVICES:
+        dispatcher.register(const.MessageType.presentation, sensorType, processPresentationMsg)
+    dispatcher.register(const.MessageType.presentation, const.Presentation.S_ARDUINO_NODE, processNodePresentationMsg)
+    dispatcher.register(const.MessageType.presentation, const.Presentation.S_ARDUINO_REPEATER_NODE, processNodePresentationMsg)
+    dispatcher.registerAll(const.MessageType.set, processSetMsg)
+    dispatcher.registerAll(const.MessageType.req, processReqMsg)
+    dispatcher.register(const.MessageType.stream, const.Stream.ST_FIRMWARE_CONFIG_REQUEST, processFirmwareConfigMsg)
+    dispatcher.register(const.MessageType.stream, const.Stream.ST_FIRMWARE_REQUEST, processFirmwareRequestMsg)
+    dispatcher.registerAll(const.MessageType.stream, processStreamMsg)
+    return dispatcher
+
+# Decode datagram and convert set values ahead, run on pipeline workers
+def decodeAndStage(data):
+    mySensorsMsg = MySensorsMessage.fromBytes(data)
+    if mySensorsMsg is not None and mySensorsMsg.cmd == const.MessageType.set:
+        mySensorsMsg.staged = values.stageSetValue(mySensorsMsg.cmdType, mySensorsMsg.payload)
+    return mySensorsMsg
+
+# Handle repeated copy of a datagram, False when it has to be processed again
+def processDuplicate(Connection, Data):
+    if Connection.Name in ("SSDP", "DDD"):
+        return True
+    fields = Data.split(b";", 5)
+    if len(fields) < 6:
+        return True
+    if fields[2] == STREAM_CMD:
+        # OTA retries are answered again, the node lost our response
+        return False
+    ack = dedupCache.ackFor(Connection.Address)
+    if ack is not None:
+        # the node did not get our ack, send it again without processing
+        sendUDPData(Connection, ack)
+    return True
+
 def processInternalMsg(mySensorsMsg,Connection):
-    Domoticz.Log("Processing internal message...")
-    if int(mySensorsMsg.cmdType) == const.Internal.I_ID_REQUEST:
-        Domoticz.Log("->I_ID_REQUEST recived...")
-        # payload should have unique ID (MAC ADDRESS)
-        uniqueID = mySensorsMsg.payload
-        # check if uniqueID is already present on the system
-        nodeID = getNodeID(uniqueID)
-        Domoticz.Log("NodeID " + str(nodeID) + " assigned...")
-        # send nodeID back
-        responseMsg = MySensorsMessage()
-        responseMsg.createMsg(0, 0, int(const.MessageType.internal), 0, int(const.Internal.I_ID_RESPONSE), nodeID)
-        sendUDPMessage(Connection,responseMsg)
-    else:
-        Domoticz.Log("Unsupported request recived!")
+    log.debug("Processing internal message...")
+    log.debug("Unsupported request recived!")
+
+def processIdRequestMsg(mySensorsMsg,Connection):
+    log.debug("->I_ID_REQUEST recived...")
+    # payload should have unique ID (MAC ADDRESS)
+    uniqueID = mySensorsMsg.payload
+    if not unitAllocator.ownsUniqueID(uniqueID):
+        # answered by another shard
+        return
+    # check if uniqueID is already present on the system
+    nodeID = getNodeID(uniqueID)
+    if nodeID is None:
+        log.error("No free nodeID for %s, spread nodes over more shards", uniqueID)
+        return
+    log.info("NodeID %d assigned to %s", nodeID, uniqueID)
+    # send nodeID back
+    sendUDPData(Connection, responses.idResponse(nodeID))
+
+def processSketchNameMsg(mySensorsMsg,Connection):
+    nodeRegistry.update(mySensorsMsg.nodeID, sketchName=mySensorsMsg.payload)
+
+def processSketchVersionMsg(mySensorsMsg,Connection):
+    nodeRegistry.update(mySensorsMsg.nodeID, sketchVersion=mySensorsMsg.payload)
+
+def processHeartbeatMsg(mySensorsMsg,Connection):
+    # last seen time is already recorded for every message
+    log.debug("Heartbeat request from node %d", mySensorsMsg.nodeID)
+    sendUDPData(Connection, responses.heartbeatResponse(mySensorsMsg.nodeID))
+
+def processHeartbeatResponseMsg(mySensorsMsg,Connection):
+    log.debug("Heartbeat from node %d", mySensorsMsg.nodeID)
+
+def processTimeMsg(mySensorsMsg,Connection):
+    sendUDPData(Connection, responses.timeResponse(mySensorsMsg.nodeID))
+
+def processConfigMsg(mySensorsMsg,Connection):
+    sendUDPData(Connection, responses.configResponse(mySensorsMsg.nodeID))
+
+def processPingMsg(mySensorsMsg,Connection):
+    sendUDPData(Connection, responses.pong(mySensorsMsg.nodeID, mySensorsMsg.payload))
+
+def processDiscoverResponseMsg(mySensorsMsg,Connection):
+    # payload is the nodeID of the node's parent
+    try:
+        nodeRegistry.update(mySensorsMsg.nodeID, parent=int(mySensorsMsg.payload))
+    except ValueError:
+        log.error("Invalid discover response from node %d", mySensorsMsg.nodeID)
 
 def processPresentationMsg(mySensorsMsg,Connection):
-    Domoticz.Log("Processing presentation message...")
-    if int(mySensorsMsg.cmdType) == const.Presentation.S_BARO:
-        # Barometer device
-        Domoticz.Log("Barometer device reported...")
-        deviceUnit = int(mySensorsMsg.nodeID) + int(mySensorsMsg.sensorID)
-        CreateDevice("Barometer",deviceUnit,"Barometer",mySensorsMsg.payload)
-    elif int(mySensorsMsg.cmdType) == const.Presentation.S_HUM:
-        # Humidity device
-        Domoticz.Log("Humidity device reported...")
-        deviceUnit = int(mySensorsMsg.nodeID) + int(mySensorsMsg.sensorID)
-        CreateDevice("Humidity",deviceUnit,"Humidity",mySensorsMsg.payload)
-    elif int(mySensorsMsg.cmdType) == const.Presentation.S_TEMP:
-        # Temperature device
-        Domoticz.Log("Temperature device reported...")
-        deviceUnit = int(mySensorsMsg.nodeID) + int(mySensorsMsg.sensorID)
-        CreateDevice("Temperature",deviceUnit,"Temperature",mySensorsMsg.payload)
-    else:
-        # Curently not supported device
-        Domoticz.Log("Device not supported!")
+    log.debug("Processing presentation message...")
+    deviceName, deviceTypeName = PRESENTATION_DEVICES[mySensorsMsg.cmdType]
+    log.debug("%s device reported...", deviceName)
+    if mySensorsMsg.cmdType in COMBINED_SENSOR_TYPES:
+        # sensor types are kept to combine readings of one node
+        node = nodeRegistry.get(mySensorsMsg.nodeID)
+        sensors = dict(node.sensors or {}) if node is not None else {}
+        sensors[str(mySensorsMsg.sensorID)] = mySensorsMsg.cmdType
+        nodeRegistry.update(mySensorsMsg.nodeID, sensors=sensors)
+        combinedRoutes.pop(mySensorsMsg.nodeID, None)
+    deviceUnit = allocateDeviceUnit(mySensorsMsg.nodeID, mySensorsMsg.sensorID, mySensorsMsg.payload)
+    if deviceUnit is None:
+        log.error("No free unit for node %d sensor %d, spread nodes over more shards",
+                  mySensorsMsg.nodeID, mySensorsMsg.sensorID)
+        return
+    CreateDevice(deviceName,deviceUnit,deviceTypeName,mySensorsMsg.payload)
+
+def processNodePresentationMsg(mySensorsMsg,Connection):
+    # node itself is presented, it has no Domoticz device
+    log.debug("Node %d presented, library version: %s", mySensorsMsg.nodeID, mySensorsMsg.payload)
+    nodeRegistry.update(mySensorsMsg.nodeID, libraryVersion=mySensorsMsg.payload)
 
 def processSetMsg(mySensorsMsg,Connection):
-    Domoticz.Log("Processing set message...")
-    pass
+    log.debug("Processing set message...")
+    deviceUnit = getDeviceUnit(mySensorsMsg.nodeID, mySensorsMsg.sensorID)
+    if deviceUnit is None or deviceUnit not in Devices:
+        log.debug("No device for node %d sensor %d", mySensorsMsg.nodeID, mySensorsMsg.sensorID)
+        return
+    valueType = mySensorsMsg.cmdType
+    try:
+        layout = deviceLayouts.get(deviceUnit)
+        if layout is not None:
+            # composite device, value goes into its field of the sValue
+            nValue, sValue = 0, compositeValue(deviceUnit, layout, valueType, mySensorsMsg.payload, mySensorsMsg.staged)
+            if sValue is None:
+                log.debug("Value type %d not used by device %d", valueType, deviceUnit)
+                return
+        else:
+            nValue, sValue = values.converted(values.SET_CONVERTERS.get(valueType, values.textValue),
+                                              mySensorsMsg.payload, mySensorsMsg.staged)
+        combined = None
+        if valueType in COMBINED_VALUE_TYPES:
+            combined = combinedRoute(mySensorsMsg.nodeID, mySensorsMsg.sensorID, valueType)
+            if combined is not None:
+                combinedValue = compositeValue(combined, deviceLayouts[combined], valueType,
+                                               mySensorsMsg.payload, mySensorsMsg.staged)
+    except ValueError:
+        log.error("Invalid value '%s' for value type %d from node %d", mySensorsMsg.payload, valueType, mySensorsMsg.nodeID)
+        return
+    # every scene press is an event, even when the value did not change
+    UpdateDevice(deviceUnit, nValue, sValue, AlwaysUpdate=valueType in ALWAYS_UPDATE_TYPES, UpdateType=valueType)
+    if combined is not None:
+        UpdateDevice(combined, 0, combinedValue, UpdateType=valueType)
+
+# Store payload in its field of a composite device, report the new sValue,
+# None when the device has no field for valueType
+def compositeValue(unit, layout, valueType, payload, staged=None):
+    field = layout.fields.get(valueType)
+    if field is None:
+        return None
+    fields = compositeFields.get(unit)
+    if fields is None:
+        fields = compositeFields[unit] = layout.initialFields(Devices[unit].sValue)
+    index, converter = field
+    parts = values.converted(converter, payload, staged)
+    fields[index:index + len(parts)] = parts
+    return ";".join(fields)
+
+# Report unit of the node's combined device that also takes valueType from
+# sensorID, None if there is none
+def combinedRoute(nodeID, sensorID, valueType):
+    routes = combinedRoutes.get(nodeID)
+    if routes is None:
+        routes = combinedRoutes[nodeID] = combinedRoutesFor(nodeID)
+    route = routes.get(sensorID)
+    if route is None or valueType not in route[1]:
+        return None
+    return route[0]
+
+# Report {sensorID: (unit, value types)} of the node's combined Temp+Hum or
+# Temp+Hum+Baro device, created when the node has presented temperature and
+# humidity sensors. The lowest sensorID of each type goes into the device,
+# its own device is still updated as well.
+def combinedRoutesFor(nodeID):
+    node = nodeRegistry.get(nodeID)
+    members = {}    # sensor type -> lowest sensorID
+    for sensorID, sensorType in ((node.sensors or {}).items() if node is not None else ()):
+        if sensorType not in members or int(sensorID) < members[sensorType]:
+            members[sensorType] = int(sensorID)
+    if const.Presentation.S_TEMP not in members or const.Presentation.S_HUM not in members:
+        return {}
+    unit = getDeviceUnit(nodeID, COMBINED_SENSOR_ID)
+    if unit is None or unit not in Devices:
+        tempUnit = getDeviceUnit(nodeID, members[const.Presentation.S_TEMP])
+        if tempUnit is None or tempUnit not in Devices:
+            return {}
+        deviceID = Devices[tempUnit].DeviceID
+        typeName = "Temp+Hum+Baro" if const.Presentation.S_BARO in members else "Temp+Hum"
+        unit = allocateDeviceUnit(nodeID, COMBINED_SENSOR_ID, deviceID)
+        if unit is None:
+            log.error("No free unit for combined device of node %d", nodeID)
+            return {}
+        CreateDevice(typeName, unit, typeName, deviceID)
+    layout = deviceLayouts.get(unit)
+    if layout is None:
+        return {}
+    # a device created before a barometer was presented keeps its type
+    return {sensorID: (unit, tuple(valueType for valueType in COMBINED_SENSOR_TYPES[sensorType]
+                                   if valueType in layout.fields))
+            for sensorType, sensorID in members.items()}
+
+def processReqMsg(mySensorsMsg,Connection):
+    # node asks for the current value, answered with a set message
+    log.debug("Processing req message...")
+    deviceUnit = getDeviceUnit(mySensorsMsg.nodeID, mySensorsMsg.sensorID)
+    if deviceUnit is None or deviceUnit not in Devices:
+        log.debug("No device for node %d sensor %d", mySensorsMsg.nodeID, mySensorsMsg.sensorID)
+        return
+    # value not yet written to the device is the current one
+    pending = updateCache.pending.get(deviceUnit)
+    if pending is not None:
+        nValue, sValue = pending[0], pending[1]
+    else:
+        nValue, sValue = Devices[deviceUnit].nValue, Devices[deviceUnit].sValue
+    valueType = mySensorsMsg.cmdType
+    payload = values.reqPayload(valueType, nValue, sValue, deviceLayouts.get(deviceUnit))
+    if payload is None:
+        log.debug("Value type %d not kept by device %d", valueType, deviceUnit)
+        return
+    sendUDPData(Connection, responses.build(mySensorsMsg.nodeID, mySensorsMsg.sensorID,
+                                            const.MessageType.set, valueType, payload))
+
+def processStreamMsg(mySensorsMsg,Connection):
+    log.debug("Processing stream message...")
+    log.debug("Stream type %d not supported!", mySensorsMsg.cmdType)
+
+def processFirmwareConfigMsg(mySensorsMsg,Connection):
+    # payload: current firmware type, version, blocks, crc (and bootloader version)
+    try:
+        fwType, fwVersion, blocks, crc = hexToWords(mySensorsMsg.payload, 4)
+    except (ValueError, struct.error):
+        log.error("Invalid firmware config request from node %d", mySensorsMsg.nodeID)
+        return
+    latestVersion = firmwareCache.latest(fwType)
+    if latestVersion is None:
+        log.debug("No firmware of type %d for node %d", fwType, mySensorsMsg.nodeID)
+        return
+    image = firmwareCache.get(fwType, latestVersion)
+    if image.crc != crc or image.blocks != blocks:
+        log.info("Node %d firmware type %d version %d, offering version %d (%d blocks)",
+                 mySensorsMsg.nodeID, fwType, fwVersion, image.fwVersion, image.blocks)
+    sendUDPData(Connection, responses.build(mySensorsMsg.nodeID, mySensorsMsg.sensorID, const.MessageType.stream,
+                                            const.Stream.ST_FIRMWARE_CONFIG_RESPONSE, image.configPayload()))
+
+def processFirmwareRequestMsg(mySensorsMsg,Connection):
+    # payload: firmware type, version and requested block
+    try:
+        fwType, fwVersion, block = hexToWords(mySensorsMsg.payload, 3)
+    except (ValueError, struct.error):
+        log.error("Invalid firmware request from node %d", mySensorsMsg.nodeID)
+        return
+    image = firmwareCache.get(fwType, fwVersion)
+    if image is None or block >= image.blocks:
+        log.error("Node %d requested unknown firmware block %d of type %d version %d",
+                  mySensorsMsg.nodeID, block, fwType, fwVersion)
+        return
+    sendUDPData(Connection, responses.build(mySensorsMsg.nodeID, mySensorsMsg.sensorID, const.MessageType.stream,
+                                            const.Stream.ST_FIRMWARE_RESPONSE, image.blockPayload(block)))
 
 #############################################################################
 #                           UDP helper functions                            #
 #############################################################################
 
-def sendUDPMessage(Connection, mySensorsMsg):
-    # try sending response over UDP
-    Domoticz.Log("Send to: "+Connection.Address+":"+Connection.Port+" data: "+str(mySensorsMsg))
-    Connection.Send(str(mySensorsMsg))
+def sendUDPData(Connection, data):
+    log.debug("Send to: %s:%s data: %s", Connection.Address, Connection.Port, data)
+    outboundQueue.send(Connection, data)
             
-#    if (Parameters["Mode2"] == "True"):
-#        existingDevice = 0
-#        existingName = (Parameters["Name"]+" - "+Connection.Address)
-#        for dev in Devices:
-#            if (Devices[dev].Name == existingName):
-#                existingDevice = dev
-#        if (existingDevice == 0):
-#            Domoticz.Device(Name=Connection.Address, Unit=len(Devices)+1, TypeName="Text", Image=17).Create()
-#            Domoticz.Log("Created device: "+Connection.Address)
-#            Devices[len(Devices)].Update(nValue=1,
-#                    sValue=Connection.Address+';'+strData)
-#        else:
-#            Devices[existingDevice].Update(nValue=1,
-#                    sValue=Connection.Address+';'+strData)
+
+#############################################################################
+#                     Discovery (SSDP/DDD) host functions                   #
+#############################################################################
+
+# Create or update Text device of new or changed host
+def processDiscoveredHost(address, info):
+    log.info("Discovered host %s: %s", address, info)
+    if Parameters["Mode2"] != "True":
+        return
+    units = deviceIndex.unitsFor(address)
+    if units:
+        hostUnit = min(units)
+    else:
+        hostUnit = nextFreeUnit()
+        if hostUnit is None:
+            log.error("No free unit for host %s", address)
+            return
+        CreateDevice(address, hostUnit, "Text", address)
+    UpdateDevice(hostUnit, 1, address + ';' + info)
  
+#############################################################################
+#                          Statistics functions                             #
+#############################################################################
+
+# DeviceIDs of the devices showing plugin statistics
+STATS_RATE_DEVICE_ID = "plugin-stats-rate"
+STATS_TEXT_DEVICE_ID = "plugin-stats"
+
+# Log statistics and show them on Custom (packets/s) and Text devices
+def publishStats(summary):
+    text = formatReport(summary)
+    log.info("Statistics: %s, device updates %d (%d suppressed)", text, updateCache.flushed, updateCache.suppressed)
+    if Parameters["Mode2"] != "True":
+        return
+    for deviceID, deviceName, deviceTypeName, nValue, sValue in (
+            (STATS_RATE_DEVICE_ID, "Packets/s", "Custom", 0, "%.1f" % summary["rate"]),
+            (STATS_TEXT_DEVICE_ID, "Plugin statistics", "Text", 0,
+             text + ", device updates %d (%d suppressed)" % (updateCache.flushed, updateCache.suppressed))):
+        units = deviceIndex.unitsFor(deviceID)
+        if units:
+            statsUnit = min(units)
+        else:
+            statsUnit = nextFreeUnit()
+            if statsUnit is None:
+                return
+            CreateDevice(deviceName, statsUnit, deviceTypeName, deviceID)
+        UpdateDevice(statsUnit, nValue, sValue)
+
 #############################################################################
 #                         Domoticz helper functions                         #
 #############################################################################
 
-# Update Device into database
-def UpdateDevice(Unit, nValue, sValue, AlwaysUpdate=False):
+# Report listeners for discovery type, other addresses are treated as MySensors
+def getListeners(discoveryType):
+    if discoveryType == "All":
+        return LISTENERS
+    sAddress, sep, sPort = discoveryType.partition(':')
+    for name, address, port in LISTENERS:
+        if (address, port) == (sAddress, sPort):
+            return ((name, address, port),)
+    return (("MySensors", sAddress, sPort),)
+
+# Parse 'key=value;key=value' options string
+def parseOptions(text):
+    parsed = {}
+    for item in text.split(';'):
+        key, sep, value = item.partition('=')
+        if sep and key.strip():
+            parsed[key.strip()] = value.strip()
+    return parsed
+
+# Report option converted by valueType, default if not set or not valid
+def getOption(name, default, valueType=str):
+    try:
+        return valueType(options[name])
+    except (KeyError, ValueError):
+        return default
+
+# Minimum seconds between two writes of the same device, per SetReq type
+MIN_UPDATE_PERIODS = {
+    const.SetReq.V_WATT: 10,
+    const.SetReq.V_KWH: 60,
+    const.SetReq.V_VOLTAGE: 10,
+    const.SetReq.V_CURRENT: 10,
+    const.SetReq.V_IMPEDANCE: 10,
+    const.SetReq.V_VAR: 10,
+    const.SetReq.V_VA: 10,
+    const.SetReq.V_POWER_FACTOR: 10,
+}
+
+# SetReq types written even when the device value did not change
+ALWAYS_UPDATE_TYPES = (const.SetReq.V_SCENE_ON, const.SetReq.V_SCENE_OFF)
+
+# SetReq types written at once: switch states and events that scripts react to
+IMMEDIATE_UPDATE_TYPES = values.SWITCH_TYPES + (const.SetReq.V_PERCENTAGE,)
+
+# Queue device update, written by the update cache (switch states at once)
+def UpdateDevice(Unit, nValue, sValue, AlwaysUpdate=False, UpdateType=None):
     # Make sure that the Domoticz device still exists (they can be deleted) before updating it
+    if Unit in Devices:
+        if AlwaysUpdate == True:
+            updateCache.write(Unit, nValue, sValue)
+        else:
+            updateCache.update(Unit, nValue, sValue, UpdateType)
+    return
+
+# Update Device into database, returns True if device was updated
+def writeDevice(Unit, nValue, sValue, AlwaysUpdate=False):
     if Unit in Devices:
         if Devices[Unit].nValue != nValue or Devices[Unit].sValue != sValue or AlwaysUpdate == True:
             Devices[Unit].Update(nValue, str(sValue))
-            Domoticz.Log("Update " + Devices[Unit].Name + ": " + str(nValue) + " - '" + str(sValue) + "'")
-    return
+            log.debug("Update %s: %s - '%s'", Devices[Unit].Name, nValue, sValue)
+            return True
+    return False
 
 # Create device
 def CreateDevice(deviceName,deviceUnit,deviceTypeName,deviceID):
-    Domoticz.Log("Creating device...")
+    log.debug("Creating device...")
     if deviceUnit in Devices:
         # device already present
-        Domoticz.Log("Device already present.")
+        log.debug("Device already present.")
         pass
     else:
         # create device
         Domoticz.Device(deviceName,deviceUnit,deviceTypeName,DeviceID=deviceID).Create()
-        Domoticz.Log("Device" + str(deviceName) + " created.")
+        deviceIndex.deviceAdded(deviceUnit,deviceID)
+        if deviceTypeName in values.LAYOUTS:
+            deviceLayouts[deviceUnit] = values.LAYOUTS[deviceTypeName]
+        log.info("Device %s created.", deviceName)
+
+# Report unit of the device for child sensor of a node, None if it has none
+def getDeviceUnit(nodeID, sensorID):
+    unit = unitAllocator.unitFor(nodeID, sensorID)
+    if unit is None:
+        unit = adoptLegacyUnit(nodeID, sensorID)
+    return unit
+
+# Report device created at nodeID + sensorID by earlier versions, assigned to
+# the sensor so nodes keep their devices without presenting again
+def adoptLegacyUnit(nodeID, sensorID):
+    unit = nodeID + sensorID
+    if unit not in Devices or unit in unitAllocator.sensors:
+        return None
+    deviceID = Devices[unit].DeviceID
+    node = nodeRegistry.get(nodeID)
+    if node is not None and node.uniqueID is not None:
+        if node.uniqueID != deviceID:
+            return None
+    else:
+        # earlier versions numbered a node by the lowest unit of its devices,
+        # so none of the node's devices is below its nodeID; it is above when
+        # the node has no sensor 0, unless a node with that nodeID is known
+        legacyNodeID = deviceIndex.legacyNodeID(deviceID)
+        if (legacyNodeID is None or legacyNodeID < nodeID
+                or (legacyNodeID > nodeID and legacyNodeID in nodeRegistry.nodes)
+                or unitAllocator.nodeIDFor(deviceID) not in (None, nodeID)):
+            return None
+        unitAllocator.setUniqueID(nodeID, deviceID)
+    unitAllocator.assign(nodeID, sensorID, unit)
+    return unit
+
+# Report unit for child sensor of a node, allocated on first presentation
+def allocateDeviceUnit(nodeID, sensorID, deviceID):
+    unit = unitAllocator.unitFor(nodeID, sensorID)
+    if unit is None:
+        # keep device created at nodeID + sensorID by earlier versions
+        unit = nodeID + sensorID
+        if unit not in Devices or Devices[unit].DeviceID != deviceID or unit in unitAllocator.sensors:
+            unit = nextFreeUnit()
+            if unit is None:
+                return None
+        unitAllocator.assign(nodeID, sensorID, unit)
+    return unit
+
+# Report free unit not allocated to a child sensor, None if there is none
+def nextFreeUnit():
+    return deviceIndex.nextFreeUnit(unitAllocator.sensors)
 
 # Report new / current nodeID depending on uniqueID
 def getNodeID(uniqueID):
-    foundUnits = []
-    for x in Devices:
-        if Devices[x].DeviceID == uniqueID:
-            foundUnits.append(x)
-    if len(foundUnits) > 0:
-        return min(foundUnits)
-    else:
-        if len(Devices) > 0:
-            return max(Devices)+1
-        else:
-            return 1
+    # nodes numbered by unit in earlier versions keep their nodeID
+    return unitAllocator.assignNodeID(uniqueID, deviceIndex.legacyNodeID(uniqueID))
 
 # Dump configuration to log
 def DumpConfigToLog():
     for x in Parameters:
         if Parameters[x] != "":
-            Domoticz.Log( "'" + x + "':'" + str(Parameters[x]) + "'")
-    Domoticz.Log("Device count: " + str(len(Devices)))
-    if len(Devices) > 0 : Domoticz.Log("Highest Unit: " + str(max(Devices)))
-    for x in Devices:
-        Domoticz.Log("Device:           " + str(x) + " - " + str(Devices[x]))
-        Domoticz.Log("Device ID:       '" + str(Devices[x].ID) + "'")
-        Domoticz.Log("Device HwID:     '" + str(Devices[x].DeviceID) + "'")
-        Domoticz.Log("Device Name:     '" + Devices[x].Name + "'")
-        Domoticz.Log("Device nValue:    " + str(Devices[x].nValue))
-        Domoticz.Log("Device sValue:   '" + Devices[x].sValue + "'")
-        Domoticz.Log("Device LastLevel: " + str(Devices[x].LastLevel))
+            log.debug("'%s':'%s'", x, Parameters[x])
+    log.info("Device count: %d", len(Devices))
+    if len(Devices) > 0 : log.info("Highest Unit: %d", deviceIndex.highestUnit)
+    if not log.debugEnabled:
+        return
+    # deviceDump option: all, none or number of devices sampled
+    dump = getOption("deviceDump", "all")
+    if dump == "none":
+        return
+    units = list(Devices)
+    if dump != "all":
+        try:
+            count = max(1, int(dump))
+            units = units[::max(1, len(units) // count)][:count]
+        except ValueError:
+            pass
+    for x in units:
+        log.debug("Device:           %s - %s", x, Devices[x])
+        log.debug("Device ID:       '%s'", Devices[x].ID)
+        log.debug("Device HwID:     '%s'", Devices[x].DeviceID)
+        log.debug("Device Name:     '%s'", Devices[x].Name)
+        log.debug("Device nValue:    %s", Devices[x].nValue)
+        log.debug("Device sValue:   '%s'", Devices[x].sValue)
+        log.debug("Device LastLevel: %s", Devices[x].LastLevel)
     return
@@ -0,0 +1,59 @@
+"""Level-gated plugin logging with deferred message formatting."""
+import time
+
+DEBUG = 10
+INFO = 20
+ERROR = 40
+
+class PluginLogger:
+    """Logger that formats messages only when their level is enabled.
+
+    Messages are passed as a format string and arguments, e.g.
+    log.debug("Send to: %s:%s", Connection.Address, Connection.Port), and
+    '%' formatting (including repr() of arguments) is skipped entirely when
+    the level is disabled. Identical error lines repeated within
+    repeatWindow seconds are suppressed and counted.
+    """
+
+    MAX_TRACKED_ERRORS = 100
+
+    def __init__(self,logSink,errorSink,level=INFO,repeatWindow=60):
+        self.logSink = logSink
+        self.errorSink = errorSink
+        self.repeatWindow = repeatWindow
+        self.recentErrors = {}  # error line -> [time first logged, repeats]
+        self.setLevel(level)
+        return
+
+    def setLevel(self,level):
+        self.level = level
+        # plain attributes so hot path can test them without a call
+        self.debugEnabled = level <= DEBUG
+        self.infoEnabled = level <= INFO
+
+    def debug(self,msg,*args):
+        if self.debugEnabled:
+            self.logSink(msg % args if args else msg)
+
+    def info(self,msg,*args):
+        if self.infoEnabled:
+            self.logSink(msg % args if args else msg)
+
+    def error(self,msg,*args,now=None):
+        line = msg % args if args else msg
+        if now is None:
+            now = time.monotonic()
+        recent = self.recentErrors.get(line)
+        if recent is not None:
+            if now - recent[0] < self.repeatWindow:
+                recent[1] += 1
+                return
+            if recent[1]:
+                line += " (repeated " + str(recent[1]) + " times)"
+                recent[1] = 0
+            recent[0] = now
+        else:
+            if len(self.recentErrors) >= self.MAX_TRACKED_ERRORS:
+                self.recentErrors.clear()
+            self.recentErrors[line] = [now, 0]
+        self.errorSink(line)
@@ -0,0 +1,76 @@
+"""Counters and histograms describing plugin load."""
+import time
+from array import array
+import mySensorsIds as const
+
+HISTOGRAM_BUCKETS = 16      # bucket i counts durations below 2**i us
+
+class RingBuffer:
+    """Fixed-size buffer of the latest samples."""
+    __slots__ = ("samples", "size", "position", "count")
+
+    def __init__(self,size):
+        self.samples = array('d', bytes(8 * size))
+        self.size = size
+        self.position = 0
+        self.count = 0
+
+    def add(self,value):
+        self.samples[self.position] = value
+        self.position = (self.position + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        return self.samples[:self.count].tolist()
+
+class PluginStats:
+    """Per-packet counters with fixed memory, summarized by report()."""
+
+    def __init__(self,samples=1024):
+        # packets per MySensors message type, last slot for SSDP/DDD
+        self.packets = [0] * (len(const.MESSAGE_TYPE_NAMES) + 1)
+        self.parseFailures = 0
+        self.dispatchTimes = RingBuffer(samples)        # us
+        self.dispatchHistogram = [0] * HISTOGRAM_BUCKETS
+        self.queueDepths = RingBuffer(samples)
+        self.lastReport = time.monotonic()
+        self.lastTotal = 0
+        return
+
+    def dispatched(self,nanoseconds):
+        micros = nanoseconds // 1000
+        self.dispatchTimes.add(micros)
+        bucket = micros.bit_length()
+        self.dispatchHistogram[bucket if bucket < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1] += 1
+
+    def report(self,now=None):
+        # summary since the previous report (rates) and of the ring buffers
+        if now is None:
+            now = time.monotonic()
+        total = sum(self.packets) + self.parseFailures
+        elapsed = now - self.lastReport
+        rate = (total - self.lastTotal) / elapsed if elapsed > 0 else 0.0
+        self.lastReport = now
+        self.lastTotal = total
+        times = sorted(self.dispatchTimes.values())
+        depths = self.queueDepths.values()
+        summary = {
+            "rate": rate,
+            "packets": dict(zip(const.MESSAGE_TYPE_NAMES + ("discovery",), self.packets)),
+            "parseFailures": self.parseFailures,
+            "dispatchP50": times[len(times) // 2] if times else 0,
+            "dispatchP99": times[min(len(times) - 1, len(times) * 99 // 100)] if times else 0,
+            "dispatchMax": times[-1] if times else 0,
+            "dispatchHistogram": list(self.dispatchHistogram),
+            "queueDepth": depths[(self.queueDepths.position - 1) % self.queueDepths.size] if depths else 0,
+            "queueDepthMax": max(depths) if depths else 0,
+        }
+        return summary
+
+# Format report() summary as one line
+def formatReport(summary):
+    packets = ", ".join("%s %d" % item for item in summary["packets"].items())
+    return ("%.1f packets/s (%s, invalid %d), dispatch p50 %dus p99 %dus max %dus, queue %d (max %d)"
+            % (summary["rate"], packets, summary["parseFailures"], summary["dispatchP50"],
+               summary["dispatchP99"], summary["dispatchMax"], summary["queueDepth"], summary["queueDepthMax"]))
@@ -0,0 +1,52 @@
+"""Per-source rate limiting of received datagrams."""
+import time
+from tokenBucket import TokenBucket
+
+class SourceRateLimiter:
+    """Token bucket per source address.
+
+    A source is allowed rate datagrams per second on average with bursts
+    up to burst. Datagrams over the limit are counted per source so they can
+    be reported later. At most maxSources buckets are kept, idle (full)
+    buckets are dropped first when the limit is reached.
+    """
+
+    def __init__(self,rate=50,burst=100,maxSources=1024):
+        self.rate = rate
+        self.burst = burst
+        self.maxSources = maxSources
+        self.buckets = {}       # address -> TokenBucket
+        self.limited = {}       # address -> datagrams dropped since last report
+        # counters
+        self.allowed = 0
+        self.dropped = 0
+        return
+
+    def allow(self,address,now=None):
+        if now is None:
+            now = time.monotonic()
+        bucket = self.buckets.get(address)
+        if bucket is None:
+            if len(self.buckets) >= self.maxSources:
+                self.dropIdle(now)
+            bucket = self.buckets[address] = TokenBucket(self.rate, self.burst, now)
+        if bucket.consume(now):
+            self.allowed += 1
+            return True
+        self.dropped += 1
+        self.limited[address] = self.limited.get(address, 0) + 1
+        return False
+
+    def dropIdle(self,now):
+        for address, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.buckets[address]
+        if len(self.buckets) >= self.maxSources:
+            # everyone is busy, start over
+            self.buckets.clear()
+
+    def takeLimited(self):
+        # report and reset sources limited since last call
+        limited, self.limited = self.limited, {}
+        return limited
@@ -0,0 +1,26 @@
+"""Token bucket used for pacing and rate limiting."""
+import time
+
+class TokenBucket:
+    """Allows rate events per second on average with bursts up to capacity."""
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self,rate,capacity,now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic() if now is None else now
+
+    def refill(self,now):
+        tokens = self.tokens + (now - self.stamp) * self.rate
+        self.tokens = tokens if tokens < self.capacity else self.capacity
+        self.stamp = now
+
+    def consume(self,now,tokens=1):
+        # return True and take tokens if enough of them are available
+        if self.tokens < tokens:
+            self.refill(now)
+            if self.tokens < tokens:
+                return False
+        self.tokens -= tokens
+        return True
@@ -0,0 +1,128 @@
+"""Allocation of nodeIDs and Domoticz units, split across plugin instances."""
+import zlib
+
+# highest nodeID given to a node, 255 means no ID assigned yet
+MAX_NODE_ID = 254
+
+# Report (first, last) nodeID owned by shard of shards
+def shardRange(shard, shards):
+    return (shard * (MAX_NODE_ID + 1) // shards, (shard + 1) * (MAX_NODE_ID + 1) // shards - 1)
+
+# Parse 'shard/shards' option like '0/2', ValueError if not valid
+def parseShard(text):
+    shard, sep, shards = text.partition('/')
+    shard = int(shard)
+    shards = int(shards) if sep else 1
+    if not 0 <= shard < shards <= MAX_NODE_ID:
+        raise ValueError("shard %d/%d out of range" % (shard, shards))
+    return shard, shards
+
+class UnitAllocator:
+    """Gives every (nodeID, sensorID) its own Domoticz unit.
+
+    Several hardware instances (shards) can listen on the same port, each
+    owning a contiguous nodeID range and its own units. An ID request is
+    answered only by the shard picked by a hash of the node's unique ID,
+    which hands out a free nodeID from its range. The mapping is kept as
+    'units' of the nodes in the registry and read on first use.
+    """
+
+    def __init__(self,registry,shard=0,shards=1):
+        self.registry = registry
+        self.shard = shard
+        self.shards = shards
+        self.firstNode, self.lastNode = shardRange(shard, shards)
+        self._units = None
+        self.sensorUnits = {}   # nodeID -> {sensorID: unit}
+        self.sensorsByUnit = {} # unit -> (nodeID, sensorID)
+        self.nodeIDs = {}       # uniqueID -> nodeID
+        return
+
+    @property
+    def units(self):
+        # (nodeID, sensorID) -> unit
+        if self._units is None:
+            self.load()
+        return self._units
+
+    @property
+    def sensors(self):
+        if self._units is None:
+            self.load()
+        return self.sensorsByUnit
+
+    def load(self):
+        self._units = {}
+        self.sensorUnits = {}
+        self.sensorsByUnit = {}
+        self.nodeIDs = {}
+        for nodeID, node in self.registry.nodes.items():
+            if not self.owns(nodeID):
+                continue
+            if node.uniqueID is not None:
+                self.nodeIDs[node.uniqueID] = nodeID
+            if not node.units:
+                continue
+            for sensorID, unit in node.units.items():
+                self._units[(nodeID, int(sensorID))] = unit
+                self.sensorUnits.setdefault(nodeID, {})[int(sensorID)] = unit
+                self.sensorsByUnit[unit] = (nodeID, int(sensorID))
+
+    def owns(self,nodeID):
+        return self.firstNode <= nodeID <= self.lastNode
+
+    def ownsUniqueID(self,uniqueID):
+        # same answer in every shard, so exactly one of them replies
+        return zlib.crc32(uniqueID.encode("utf-8")) % self.shards == self.shard
+
+    def nodeIDFor(self,uniqueID):
+        if self._units is None:
+            self.load()
+        return self.nodeIDs.get(uniqueID)
+
+    def assignNodeID(self,uniqueID,preferred=None):
+        # current nodeID of uniqueID, else preferred or lowest free nodeID
+        # of the shard; None when the shard has no free nodeID left
+        nodeID = self.nodeIDFor(uniqueID)
+        if nodeID is not None:
+            return nodeID
+        nodes = self.registry.nodes
+        if preferred is None or not self.owns(preferred) or preferred in nodes:
+            # nodeID 0 is the gateway
+            preferred = next((candidate for candidate in range(max(self.firstNode, 1), self.lastNode + 1)
+                              if candidate not in nodes), None)
+            if preferred is None:
+                return None
+        self.registry.update(preferred, uniqueID=uniqueID)
+        self.nodeIDs[uniqueID] = preferred
+        return preferred
+
+    def setUniqueID(self,nodeID,uniqueID):
+        # node known by its nodeID only, e.g. numbered by an earlier version
+        if self._units is None:
+            self.load()
+        self.registry.update(nodeID, uniqueID=uniqueID)
+        self.nodeIDs[uniqueID] = nodeID
+
+    def unitFor(self,nodeID,sensorID):
+        return self.units.get((nodeID, sensorID))
+
+    def assign(self,nodeID,sensorID,unit):
+        self.units[(nodeID, sensorID)] = unit
+        self.sensorUnits.setdefault(nodeID, {})[sensorID] = unit
+        self.sensorsByUnit[unit] = (nodeID, sensorID)
+        self.saveNode(nodeID)
+
+    def release(self,unit):
+        sensor = self.sensors.pop(unit, None)
+        if sensor is None:
+            return
+        nodeID, sensorID = sensor
+        del self._units[sensor]
+        del self.sensorUnits[nodeID][sensorID]
+        self.saveNode(nodeID)
+
+    def saveNode(self,nodeID):
+        # JSON object keys are strings
+        self.registry.update(nodeID, units={str(sensorID): unit
+                                            for sensorID, unit in self.sensorUnits.get(nodeID, {}).items()})